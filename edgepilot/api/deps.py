@@ -0,0 +1,17 @@
+# edgepilot/api/deps.py
+from __future__ import annotations
+
+from fastapi import Request
+
+from ..metrics import MetricsService
+from ..scheduler import Scheduler
+
+
+# Services are bound to app.state once at startup; these resolve them with a single
+# attribute load. They are async so FastAPI calls them inline rather than via the threadpool.
+async def scheduler_dep(request: Request) -> Scheduler:
+    return request.app.state.scheduler
+
+
+async def metrics_dep(request: Request) -> MetricsService:
+    return request.app.state.metrics
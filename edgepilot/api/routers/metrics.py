@@ -1,13 +1,43 @@
 # edgepilot/api/routers/metrics.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
-from ...metrics import get_metrics_service
+import asyncio
+import time
+from typing import Dict, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from ...metrics import MetricsService
+from ..deps import metrics_dep
 
 router = APIRouter()
 
+# Pollers (UI tabs, scripts) within the TTL share one psutil scan and one serialization
+_SNAPSHOT_TTL_SEC = 1.0
+_snapshot_cache: Dict[Tuple[bool, int], Tuple[float, bytes]] = {}
+_snapshot_lock = asyncio.Lock()
+
+
+def _fresh(entry: Tuple[float, bytes] | None) -> bool:
+    return entry is not None and time.monotonic() - entry[0] < _SNAPSHOT_TTL_SEC
+
 
-@router.get("/snapshot")
-def snapshot(include_processes: bool = Query(False), top_n: int = Query(15, ge=1, le=100)):
-    svc = get_metrics_service()
-    return svc.snapshot(include_processes=include_processes, top_n=top_n)
+@router.get("/snapshot", response_model=None, response_class=ORJSONResponse)
+async def snapshot(
+    include_processes: bool = Query(False),
+    top_n: int = Query(15, ge=1, le=100),
+    svc: MetricsService = Depends(metrics_dep),
+):
+    key = (include_processes, top_n)
+    entry = _snapshot_cache.get(key)
+    if not _fresh(entry):
+        # Single-flight: concurrent misses wait for the first collector instead of rescanning
+        async with _snapshot_lock:
+            entry = _snapshot_cache.get(key)
+            if not _fresh(entry):
+                snap = await run_in_threadpool(svc.snapshot, include_processes=include_processes, top_n=top_n)
+                entry = (time.monotonic(), orjson.dumps(snap))
+                _snapshot_cache[key] = entry
+    return Response(content=entry[1], media_type="application/json")
@@ -1,10 +1,12 @@
 # edgepilot/api/routers/policies.py
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any
-from ...scheduler import get_scheduler
+from ...scheduler import Scheduler
+from ..deps import scheduler_dep
 
 router = APIRouter()
 
@@ -15,12 +17,10 @@ class PolicySetBody(BaseModel):
 
 
 @router.post("/set")
-def policy_set(body: PolicySetBody):
-    sch = get_scheduler()
+def policy_set(body: PolicySetBody, sch: Scheduler = Depends(scheduler_dep)):
     return {"active": sch.policy_set(body.name, body.rules)}
 
 
-@router.get("/simulate")
-def simulate():
-    sch = get_scheduler()
+@router.get("/simulate", response_model=None, response_class=ORJSONResponse)
+def simulate(sch: Scheduler = Depends(scheduler_dep)):
     return sch.simulate()
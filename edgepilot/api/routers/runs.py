@@ -1,9 +1,10 @@
 # edgepilot/api/routers/runs.py
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from ...metrics import get_metrics_service
+from ...metrics import MetricsService
+from ..deps import metrics_dep
 
 router = APIRouter()
 
@@ -14,8 +15,7 @@ class RunStartBody(BaseModel):
 
 
 @router.post("/start")
-async def start_run(body: RunStartBody):
-    svc = get_metrics_service()
+async def start_run(body: RunStartBody, svc: MetricsService = Depends(metrics_dep)):
     return svc.start_run(user_note=body.user_note or "", sampling_sec=body.sampling_sec)
 
 
@@ -24,6 +24,5 @@ class RunEndBody(BaseModel):
 
 
 @router.post("/end")
-async def end_run(body: RunEndBody):
-    svc = get_metrics_service()
+async def end_run(body: RunEndBody, svc: MetricsService = Depends(metrics_dep)):
     return await svc.end_run(body.run_id)
@@ -1,10 +1,14 @@
 # edgepilot/api/routers/tasks.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
+from datetime import datetime
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
-from ...scheduler import get_scheduler
+from ...scheduler import Scheduler
+from ..deps import scheduler_dep
 
 router = APIRouter()
 
@@ -22,22 +26,53 @@ class EnqueueBody(BaseModel):
 
 
 @router.post("/enqueue")
-def enqueue(body: EnqueueBody):
-    sch = get_scheduler()
+def enqueue(body: EnqueueBody, sch: Scheduler = Depends(scheduler_dep)):
     t = sch.enqueue(**body.model_dump())
     return {"task_id": t.id, "state": t.state}
 
 
-@router.get("/list")
-def list_tasks(state: str = Query("any")):
-    sch = get_scheduler()
+class TaskRead(BaseModel):
+    id: str
+    name: str
+    command: str
+    state: str
+    priority: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    pid: Optional[int] = None
+    log_path: Optional[str] = None
+
+
+class TaskListResponse(ORJSONResponse):
+    """Encodes TaskRead rows (via __dict__) or TaskColumns (natively), datetimes in C.
+
+    SQLite hands back naive datetimes that were stored as UTC, so they are tagged as such.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=vars, option=orjson.OPT_NAIVE_UTC)
+
+
+@router.get("/list", response_model=None, response_class=TaskListResponse)
+def list_tasks(state: str = Query("any"), sch: Scheduler = Depends(scheduler_dep)):
     rows = sch.list(state=state)
-    return [
-        {"id": r.id, "name": r.name, "command": r.command, "state": r.state, "priority": r.priority,
-         "created_at": r.created_at.isoformat(), "started_at": r.started_at.isoformat() if r.started_at else None,
-         "ended_at": r.ended_at.isoformat() if r.ended_at else None, "pid": r.pid, "log_path": r.log_path}
+    # Rows come from our own DB and were validated on enqueue, so model_construct skips
+    # the validator chain. Returning the response directly also skips jsonable_encoder.
+    return TaskListResponse([
+        TaskRead.model_construct(
+            id=r.id, name=r.name, command=r.command, state=r.state, priority=r.priority,
+            created_at=r.created_at, started_at=r.started_at, ended_at=r.ended_at,
+            pid=r.pid, log_path=r.log_path,
+        )
         for r in rows
-    ]
+    ])
+
+
+@router.get("/columns", response_model=None, response_class=TaskListResponse)
+def list_task_columns(state: str = Query("any"), sch: Scheduler = Depends(scheduler_dep)):
+    """Same data as /list as one array per field, for clients reading deep queues."""
+    return TaskListResponse(sch.list_columns(state=state))
 
 
 class CancelBody(BaseModel):
@@ -45,6 +80,5 @@ class CancelBody(BaseModel):
 
 
 @router.post("/cancel")
-def cancel(body: CancelBody):
-    sch = get_scheduler()
+def cancel(body: CancelBody, sch: Scheduler = Depends(scheduler_dep)):
     return {"canceled": bool(sch.cancel(body.task_id))}
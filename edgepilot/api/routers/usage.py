@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from ...usage import usage_stats
 
 router = APIRouter()
 
 
-@router.get("/stats")
+@router.get("/stats", response_model=None, response_class=ORJSONResponse)
 def stats():
     return usage_stats()
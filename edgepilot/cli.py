@@ -2,23 +2,47 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
+import os
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+import orjson
 import typer
 from rich import print as rprint
 
 from edgepilot.config import run_wizard, get_config
-from edgepilot.mcp.server import run_mcp
-from edgepilot.metrics import get_metrics_service
-from edgepilot.scheduler import get_scheduler
-from edgepilot.llm.ollama import OllamaProvider
-from edgepilot.usage import usage_stats
+
+# Service modules (metrics, scheduler, MCP, LLM, usage) are imported inside the commands
+# that need them, so one-shot commands like `wizard` or `ui` don't pay for all of them.
 
 # Root app
 app = typer.Typer(add_completion=False, help="EdgePilot CLI")
 
+
+@functools.lru_cache(maxsize=None)
+def _split_template(path: Path) -> Tuple[bytes, bytes, bytes]:
+    """Split a prompt template around its {{ question }} and {{ snapshot_json }} markers."""
+    raw = path.read_bytes()
+    pre, rest = raw.split(b"{{ question }}", 1)
+    mid, post = rest.split(b"{{ snapshot_json }}", 1)
+    return pre, mid, post
+
+
+_BOTTLENECK_PATH = Path(__file__).resolve().parent / "llm" / "prompts" / "bottleneck.md"
+
+
+def _truncate_utf8(data: bytes, limit: int) -> bytes:
+    """Cut UTF-8 bytes to at most `limit` without splitting a multi-byte character."""
+    if len(data) <= limit:
+        return data
+    end = limit
+    # data[end] is the first dropped byte; if it is a continuation byte, back off to its lead byte
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return data[:end]
+
 # --------------------------- Top-level commands ---------------------------
 
 @app.command()
@@ -34,7 +58,20 @@ def api(host: Optional[str] = None, port: Optional[int] = None):
     h = host or cfg.host
     p = port or cfg.api_port
     import uvicorn
-    uvicorn.run("edgepilot.api.main:app", host=h, port=p, reload=False)
+    # uvicorn[standard] ships uvloop + httptools; uvloop has no Windows build, so fall back to asyncio there.
+    uvicorn.run(
+        "edgepilot.api.main:app",
+        host=h,
+        port=p,
+        reload=False,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        access_log=False,
+        proxy_headers=False,
+        log_level="debug" if cfg.debug else "warning",
+        # One process by default: each worker would run its own scheduler over the same queue
+        workers=int(os.environ.get("EDGEPILOT_WORKERS", "1")),
+    )
 
 
 @app.command()
@@ -51,6 +88,8 @@ def ui(port: Optional[int] = None):
 @app.command()
 def mcp():
     """Start the MCP server on stdio transport."""
+    from edgepilot.mcp.server import run_mcp
+
     run_mcp()
 
 # --------------------------- Sub-apps (Typer way) ---------------------------
@@ -66,6 +105,8 @@ def run_start(
     user_note: str = typer.Option("", help="Note for the run"),
     sampling_sec: Optional[int] = typer.Option(None, help="Sampling seconds"),
 ):
+    from edgepilot.metrics import get_metrics_service
+
     svc = get_metrics_service()
     res = svc.start_run(user_note=user_note, sampling_sec=sampling_sec)
     rprint(res)
@@ -73,6 +114,8 @@ def run_start(
 
 @run_app.command("end")
 def run_end(run_id: str):
+    from edgepilot.metrics import get_metrics_service
+
     svc = get_metrics_service()
     res = asyncio.run(svc.end_run(run_id))
     rprint(res)
@@ -80,21 +123,31 @@ def run_end(run_id: str):
 # ---- metrics ----
 @metrics_app.command("snapshot")
 def metrics_snapshot(include_processes: bool = False, top_n: int = 15):
+    from edgepilot.metrics import get_metrics_service
+
     svc = get_metrics_service()
     rprint(svc.snapshot(include_processes=include_processes, top_n=top_n))
 
 
 @metrics_app.command("stream")
-def metrics_stream(interval_sec: float = 2.0):
+def metrics_stream(interval_sec: float = 2.0, include_processes: bool = False):
+    from edgepilot.metrics import get_metrics_service
+
     svc = get_metrics_service()
-    sid = svc.start_stream(interval=interval_sec)
-    rprint({"stream_id": sid, "note": "Press Ctrl+C to stop"})
+
+    async def _consume():
+        # The stream's producer task needs a running loop; samples are printed as they arrive
+        sid = svc.start_stream(interval=interval_sec, include_processes=include_processes)
+        rprint({"stream_id": sid, "note": "Press Ctrl+C to stop"})
+        try:
+            while True:
+                rprint(await svc.stream_next(sid))
+        finally:
+            svc.stop_stream(sid)
+
     try:
-        while True:
-            import time
-            time.sleep(1)
+        asyncio.run(_consume())
     except KeyboardInterrupt:
-        svc.stop_stream(sid)
         rprint({"stopped": True})
 
 # ---- task ----
@@ -109,6 +162,8 @@ def task_enqueue(
     max_mem_mb: int = 0,
     min_vram_mb: int = 0,
 ):
+    from edgepilot.scheduler import get_scheduler
+
     sch = get_scheduler()
     t = sch.enqueue(
         name=name,
@@ -125,6 +180,8 @@ def task_enqueue(
 
 @task_app.command("list")
 def task_list(state: str = "any"):
+    from edgepilot.scheduler import get_scheduler
+
     sch = get_scheduler()
     rows = sch.list(state=state)
     rprint(
@@ -137,12 +194,15 @@ def task_list(state: str = "any"):
 
 @task_app.command("cancel")
 def task_cancel(task_id: str):
+    from edgepilot.scheduler import get_scheduler
+
     sch = get_scheduler()
     rprint({"canceled": sch.cancel(task_id)})
 
 # ---- policy ----
 @policy_app.command("set")
 def policy_set(preset: str = typer.Argument("balanced_defaults")):
+    from edgepilot.scheduler import get_scheduler
     from edgepilot.scheduler.policies import PRESETS
 
     if preset not in PRESETS:
@@ -155,6 +215,8 @@ def policy_set(preset: str = typer.Argument("balanced_defaults")):
 
 @policy_app.command("show")
 def policy_show():
+    from edgepilot.scheduler import get_scheduler
+
     sch = get_scheduler()
     rprint(sch.simulate())
 
@@ -167,13 +229,16 @@ app.add_typer(policy_app, name="policy")
 # ---- advisor (top-level command) ----
 @app.command()
 def advise(question: str = typer.Argument(..., help="Ask a quick question; uses snapshot + local LLM")):
+    from edgepilot.llm.ollama import OllamaProvider, complete_once
+    from edgepilot.metrics import get_metrics_service
+    from edgepilot.usage import usage_stats
+
     svc = get_metrics_service()
-    snap = svc.snapshot(include_processes=True)
+    snap = svc.snapshot_for_llm()
     provider = OllamaProvider()
-    prompt_path = Path(__file__).resolve().parent / "llm" / "prompts" / "bottleneck.md"
-    prompt = prompt_path.read_text()
-    prompt = prompt.replace("{{ question }}", question)
-    prompt = prompt.replace("{{ snapshot_json }}", json.dumps(snap)[:8000])
-    res = asyncio.run(provider.complete(prompt))
+    pre, mid, post = _split_template(_BOTTLENECK_PATH)
+    payload = _truncate_utf8(orjson.dumps(snap), 8000)
+    prompt = b"".join((pre, question.encode(), mid, payload, post)).decode()
+    res = asyncio.run(complete_once(provider, prompt))
     rprint(res.text)
     rprint(usage_stats())
@@ -1,16 +1,22 @@
 # edgepilot/config.py
 """Configuration management for EdgePilot"""
 
+import functools
 import os
 import shutil
 import subprocess
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Optional, Literal, Set
 import yaml
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
 
+# libyaml C bindings when PyYAML was built with them; pure-Python loader/dumper otherwise
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
 class LLMConfig(BaseModel):
     """LLM provider configuration"""
     provider: Literal["ollama", "anthropic", "gemini"] = "ollama"
@@ -29,8 +35,10 @@ class MetricsConfig(BaseModel):
     stream_interval: int = 2  # default streaming interval
     retain_days: int = 30  # days to keep metrics
     process_top_n: int = 15  # top N processes to track
+    flush_interval_sec: float = 5.0  # buffered run samples are committed at most this often
     enable_gpu: bool = True
     enable_power: bool = True
+    powermetrics_stream: bool = False  # macOS: keep `sudo -n powermetrics` running instead of polling pmset
 
 
 class SchedulerConfig(BaseModel):
@@ -102,17 +110,25 @@ def load_config(path: Optional[Path] = None) -> Config:
     if path is None:
         path = Path.home() / ".edgepilot" / "config.yaml"
 
-    if not path.exists():
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
         # Return default config if file doesn't exist
         cfg = Config()
         # Ensure base directories exist on first import
-        cfg.storage.base_dir.mkdir(parents=True, exist_ok=True)
-        cfg.storage.log_path.mkdir(parents=True, exist_ok=True)
-        cfg.storage.data_path.mkdir(parents=True, exist_ok=True)
+        _ensure_storage_dirs(cfg)
         return cfg
 
+    # Re-parse only when the file changed since the last load; copy so callers can't mutate the cached model
+    cfg = _load_config_cached(str(path), mtime_ns).model_copy(deep=True)
+    _ensure_storage_dirs(cfg)
+    return cfg
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(path: str, mtime_ns: int) -> Config:
     with open(path, "r") as f:
-        data = yaml.safe_load(f) or {}
+        data = yaml.load(f, Loader=_YamlLoader) or {}
 
     # Parse nested configs
     config_data = {}
@@ -134,11 +150,18 @@ def load_config(path: Optional[Path] = None) -> Config:
         if key in data:
             config_data[key] = data[key]
 
-    cfg = Config(**config_data)
-    cfg.storage.base_dir.mkdir(parents=True, exist_ok=True)
-    cfg.storage.log_path.mkdir(parents=True, exist_ok=True)
-    cfg.storage.data_path.mkdir(parents=True, exist_ok=True)
-    return cfg
+    return Config(**config_data)
+
+
+_ensured_dirs: Set[Path] = set()
+
+
+def _ensure_storage_dirs(cfg: Config) -> None:
+    """Create the storage directories, touching the filesystem once per path per process"""
+    for d in (cfg.storage.base_dir, cfg.storage.log_path, cfg.storage.data_path):
+        if d not in _ensured_dirs:
+            d.mkdir(parents=True, exist_ok=True)
+            _ensured_dirs.add(d)
 
 
 def save_config(config: Config, path: Optional[Path] = None):
@@ -170,7 +193,7 @@ def save_config(config: Config, path: Optional[Path] = None):
     }
 
     with open(path, "w") as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(data, f, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
 
 
 def run_wizard():
@@ -251,9 +274,7 @@ def run_wizard():
 
     save_config(cfg)
 
-    cfg.storage.base_dir.mkdir(parents=True, exist_ok=True)
-    cfg.storage.log_path.mkdir(parents=True, exist_ok=True)
-    cfg.storage.data_path.mkdir(parents=True, exist_ok=True)
+    _ensure_storage_dirs(cfg)
 
     table = Table(title="Configuration Summary")
     table.add_column("Key")
@@ -10,6 +10,7 @@ from .models import Base
 
 _engine = None
 _SessionLocal = None
+_initialized = False
 
 
 def get_engine():
@@ -17,12 +18,16 @@ def get_engine():
     if _engine is None:
         db_path: Path = get_config().storage.db_path
         db_path.parent.mkdir(parents=True, exist_ok=True)
-        _engine = create_engine(f"sqlite:///{db_path}", future=True, echo=False)
-        # Ensure foreign keys in SQLite
+        # Pool sized for the API threadpool plus the scheduler/metrics threads; SQLite connections never
+        # go stale, so no pre-ping/recycle round-trips on checkout
+        _engine = create_engine(f"sqlite:///{db_path}", future=True, echo=False, pool_size=10, max_overflow=20)
+        # Ensure foreign keys in SQLite; WAL + NORMAL so commits don't fsync every time
         @event.listens_for(_engine, "connect")
         def _set_sqlite_pragma(dbapi_conn, connection_record):
             cursor = dbapi_conn.cursor()
             cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
             cursor.close()
     return _engine
 
@@ -30,7 +35,9 @@ def get_engine():
 def get_session_factory():
     global _SessionLocal
     if _SessionLocal is None:
-        _SessionLocal = sessionmaker(bind=get_engine(), class_=Session, autoflush=False, autocommit=False, future=True)
+        # Rows returned from a session_scope() (e.g. Scheduler.list) are read after it commits
+        _SessionLocal = sessionmaker(bind=get_engine(), class_=Session, autoflush=False, autocommit=False,
+                                     expire_on_commit=False, future=True)
     return _SessionLocal
 
 
@@ -49,5 +56,14 @@ def session_scope() -> Session:
 
 
 def init_db():
+    # Callers on hot paths (usage, enqueue) may call this freely; create_all runs once per process
+    global _initialized
+    if _initialized:
+        return
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, indexes included; add indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _initialized = True
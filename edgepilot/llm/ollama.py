@@ -1,36 +1,98 @@
 # edgepilot/llm/ollama.py
 from __future__ import annotations
 
+import asyncio
 import time
+import weakref
+from contextlib import asynccontextmanager
 import httpx
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from .provider import LLMProvider, LLMResult
 from ..config import get_config
 from ..usage import record_usage
 
+# One pooled client per event loop: keep-alive connections are reused across calls, but
+# never across loops (the CLI and UI each drive calls through their own asyncio.run()).
+_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=32)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=120, limits=_LIMITS)
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client() -> None:
+    """Close the pooled client bound to the running event loop, if any."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class CompletionBuffer:
+    """Collects prompts and dispatches them in batches over the shared pooled client.
+
+    Ollama has no multi-prompt endpoint, so a batch is sent as concurrent keep-alive
+    requests; `submit` returns a future that resolves to the prompt's LLMResult.
+    """
+
+    def __init__(self, provider: "OllamaProvider", max_batch: int = 8, system: str | None = None):
+        self._provider = provider
+        self._max_batch = max(1, max_batch)
+        self._system = system
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flushes: List[asyncio.Task] = []
+
+    def submit(self, prompt: str) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, fut))
+        if len(self._pending) >= self._max_batch:
+            self._flushes.append(asyncio.create_task(self.flush()))
+        return fut
+
+    async def flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        results = await asyncio.gather(
+            *(self._provider.complete(prompt, self._system) for prompt, _ in batch), return_exceptions=True
+        )
+        for (_, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    async def drain(self) -> None:
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+            self._flushes.clear()
+
 
 class OllamaProvider(LLMProvider):
     def __init__(self):
         self.cfg = get_config()
+        self._url = (self.cfg.llm.base_url or "http://localhost:11434").rstrip("/") + "/api/generate"
+        self._options = {
+            "temperature": self.cfg.llm.temperature,
+            "num_ctx": self.cfg.llm.num_ctx or 8192,
+        }
 
     async def complete(self, prompt: str, system: str | None = None) -> LLMResult:
-        url = (self.cfg.llm.base_url or "http://localhost:11434").rstrip("/") + "/api/generate"
         # Basic "system" prefixing for now
         req_prompt = (f"System: {system}\n\n" if system else "") + prompt
-        body = {
-            "model": self.cfg.llm.model,
-            "prompt": req_prompt,
-            "stream": False,
-            "options": {
-                "temperature": self.cfg.llm.temperature,
-                "num_ctx": self.cfg.llm.num_ctx or 8192,
-            },
-        }
+        body = {"model": self.cfg.llm.model, "prompt": req_prompt, "stream": False, "options": self._options}
         t0 = time.time()
-        async with httpx.AsyncClient(timeout=120) as client:
-            r = await client.post(url, json=body)
-            r.raise_for_status()
-            data = r.json()
+        r = await _get_client().post(self._url, json=body)
+        r.raise_for_status()
+        data = r.json()
         latency = int((time.time() - t0) * 1000)
         text = data.get("response", "")
         # Ollama doesn't return token counts reliably; estimate by chars
@@ -39,3 +101,20 @@ class OllamaProvider(LLMProvider):
         record_usage("ollama", self.cfg.llm.model, prompt_len=len(req_prompt),
                      response_len=len(text), tool_calls=0, tokens_in=tokens_in, tokens_out=tokens_out, latency_ms=latency, ok=True)
         return LLMResult(text=text, tokens_in=tokens_in, tokens_out=tokens_out, latency_ms=latency, raw=data)
+
+    @asynccontextmanager
+    async def buffered_complete(self, max_batch: int = 8, system: str | None = None) -> AsyncIterator[CompletionBuffer]:
+        """Yield a CompletionBuffer; anything still pending is sent when the block exits."""
+        buf = CompletionBuffer(self, max_batch=max_batch, system=system)
+        try:
+            yield buf
+        finally:
+            await buf.drain()
+
+
+async def complete_once(provider: OllamaProvider, prompt: str) -> LLMResult:
+    """provider.complete() for a one-shot asyncio.run(): closes the loop's pooled client before the loop goes away."""
+    try:
+        return await provider.complete(prompt)
+    finally:
+        await aclose_client()
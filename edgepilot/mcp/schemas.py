@@ -19,6 +19,11 @@ class StreamStopInput(BaseModel):
     stream_id: str
 
 
+class StreamNextInput(BaseModel):
+    stream_id: str
+    timeout_sec: float = Field(default=30.0, gt=0)
+
+
 class RunStartInput(BaseModel):
     user_note: Optional[str] = None
     sampling_sec: Optional[int] = Field(default=None, gt=0)
@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, Optional
+import inspect
+from typing import Annotated, Any, Awaitable, Callable, Optional, Type
 
 from mcp.server.fastmcp import FastMCP  # Tool may not exist in newer mcp
 try:
@@ -12,12 +13,14 @@ except Exception:  # pragma: no cover
     Tool = None
     HAS_TOOL_CLASS = False
 
+from pydantic import BaseModel
+
 from .schemas import (
-    SnapshotInput, StreamStartInput, StreamStopInput, RunStartInput, RunEndInput,
+    SnapshotInput, StreamStartInput, StreamStopInput, StreamNextInput, RunStartInput, RunEndInput,
     EnqueueInput, ListInput, CancelInput, PolicySetInput, SimulateInput,
 )
 from .tools import (
-    do_metrics_snapshot, do_metrics_stream_start, do_metrics_stream_stop,
+    do_metrics_snapshot, do_metrics_stream_start, do_metrics_stream_next, do_metrics_stream_stop,
     do_runs_start, do_runs_end,
     do_scheduler_enqueue, do_scheduler_list, do_scheduler_cancel, do_scheduler_policy_set, do_scheduler_simulate,
     do_usage_stats,
@@ -25,140 +28,72 @@ from .tools import (
 from ..db import init_db
 
 
+# name, description, input model (None: no arguments), handler
+TOOLS = (
+    ("metrics.snapshot", "Return a single system snapshot. Optional include top-N processes.",
+     SnapshotInput, do_metrics_snapshot),
+    ("metrics.stream_start", "Start metrics streaming at a given interval (seconds). Returns a stream_id.",
+     StreamStartInput, do_metrics_stream_start),
+    ("metrics.stream_next", "Wait for the next sample of a stream (null on timeout or unknown stream_id).",
+     StreamNextInput, do_metrics_stream_next),
+    ("metrics.stream_stop", "Stop a running metrics stream by stream_id.",
+     StreamStopInput, do_metrics_stream_stop),
+    ("runs.start", "Create a Run and begin higher-frequency sampling.",
+     RunStartInput, do_runs_start),
+    ("runs.end", "Stop sampling for the Run, produce a short metrics report, and store it.",
+     RunEndInput, do_runs_end),
+    ("scheduler.enqueue", "Queue a local task (shell command).",
+     EnqueueInput, do_scheduler_enqueue),
+    ("scheduler.list", "List tasks and states. state=any for all.",
+     ListInput, do_scheduler_list),
+    ("scheduler.cancel", "Cancel a queued or running task.",
+     CancelInput, do_scheduler_cancel),
+    ("scheduler.policy_set", "Activate/modify policy rules (simple JSON).",
+     PolicySetInput, do_scheduler_policy_set),
+    ("scheduler.simulate", "Given current metrics + queue, return a proposed start time for each task and reasoning.",
+     SimulateInput, do_scheduler_simulate),
+    ("usage.stats", "Return LLM usage metrics/counters.",
+     None, do_usage_stats),
+)
+
+
+def _signature(model: Type[BaseModel]) -> inspect.Signature:
+    # Keyword parameters mirroring the model's fields, constraints carried as Annotated metadata
+    params = [
+        inspect.Parameter(
+            name, inspect.Parameter.KEYWORD_ONLY,
+            default=inspect.Parameter.empty if f.is_required() else f.default,
+            annotation=Annotated[(f.annotation, *f.metadata)] if f.metadata else f.annotation,
+        )
+        for name, f in model.model_fields.items()
+    ]
+    return inspect.Signature(params)
+
+
+def _wrap(model: Optional[Type[BaseModel]], func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    if model is None:
+        async def _tool():
+            return await func()
+        return _tool
+
+    # FastMCP already validated the arguments against the signature; don't validate them again
+    async def _tool(**kwargs):
+        return await func(model.model_construct(**kwargs))
+    _tool.__signature__ = _signature(model)
+    return _tool
+
+
 def build_server() -> FastMCP:
     # Newer mcp.FastMCP only takes the server name
     server = FastMCP("edgepilot-mcp")
 
-    if HAS_TOOL_CLASS:
-        # ----- Older API path (Tool class available) -----
-        server.add_tool(Tool(
-            name="metrics.snapshot",
-            description="Return a single system snapshot. Optional include top-N processes.",
-            input_model=SnapshotInput,
-            func=do_metrics_snapshot,
-        ))
-        server.add_tool(Tool(
-            name="metrics.stream_start",
-            description="Start metrics streaming at a given interval (seconds). Returns a stream_id.",
-            input_model=StreamStartInput,
-            func=do_metrics_stream_start,
-        ))
-        server.add_tool(Tool(
-            name="metrics.stream_stop",
-            description="Stop a running metrics stream by stream_id.",
-            input_model=StreamStopInput,
-            func=do_metrics_stream_stop,
-        ))
-        server.add_tool(Tool(
-            name="runs.start",
-            description="Create a Run and begin higher-frequency sampling.",
-            input_model=RunStartInput,
-            func=do_runs_start,
-        ))
-        server.add_tool(Tool(
-            name="runs.end",
-            description="Stop sampling for the Run, produce a short metrics report, and store it.",
-            input_model=RunEndInput,
-            func=do_runs_end,
-        ))
-        server.add_tool(Tool(
-            name="scheduler.enqueue",
-            description="Queue a local task (shell command).",
-            input_model=EnqueueInput,
-            func=do_scheduler_enqueue,
-        ))
-        server.add_tool(Tool(
-            name="scheduler.list",
-            description="List tasks and states. state=any for all.",
-            input_model=ListInput,
-            func=do_scheduler_list,
-        ))
-        server.add_tool(Tool(
-            name="scheduler.cancel",
-            description="Cancel a queued or running task.",
-            input_model=CancelInput,
-            func=do_scheduler_cancel,
-        ))
-        server.add_tool(Tool(
-            name="scheduler.policy_set",
-            description="Activate/modify policy rules (simple JSON).",
-            input_model=PolicySetInput,
-            func=do_scheduler_policy_set,
-        ))
-        server.add_tool(Tool(
-            name="scheduler.simulate",
-            description="Given current metrics + queue, return a proposed start time for each task and reasoning.",
-            input_model=SimulateInput,
-            func=do_scheduler_simulate,
-        ))
-        server.add_tool(Tool(
-            name="usage.stats",
-            description="Return LLM usage metrics/counters.",
-            input_model=None,
-            func=do_usage_stats,
-        ))
-        return server
-
-    # ----- Newer API path (decorator style, no Tool class) -----
-    @server.tool(name="metrics.snapshot",
-                 description="Return a single system snapshot. Optional include top-N processes.")
-    async def _metrics_snapshot(include_processes: bool = False, top_n: int = 15):
-        return await do_metrics_snapshot(SnapshotInput(include_processes=include_processes, top_n=top_n))
-
-    @server.tool(name="metrics.stream_start",
-                 description="Start metrics streaming at a given interval (seconds). Returns a stream_id.")
-    async def _metrics_stream_start(interval_sec: float = 2.0, include_processes: bool = False):
-        return await do_metrics_stream_start(StreamStartInput(interval_sec=interval_sec, include_processes=include_processes))
-
-    @server.tool(name="metrics.stream_stop",
-                 description="Stop a running metrics stream by stream_id.")
-    async def _metrics_stream_stop(stream_id: str):
-        return await do_metrics_stream_stop(StreamStopInput(stream_id=stream_id))
-
-    @server.tool(name="runs.start",
-                 description="Create a Run and begin higher-frequency sampling.")
-    async def _runs_start(user_note: Optional[str] = None, sampling_sec: Optional[int] = None):
-        return await do_runs_start(RunStartInput(user_note=user_note, sampling_sec=sampling_sec))
-
-    @server.tool(name="runs.end",
-                 description="Stop sampling for the Run, produce a short metrics report, and store it.")
-    async def _runs_end(run_id: str):
-        return await do_runs_end(RunEndInput(run_id=run_id))
-
-    @server.tool(name="scheduler.enqueue",
-                 description="Queue a local task (shell command).")
-    async def _scheduler_enqueue(
-        name: str, command: str, requires_gpu: bool = False, est_runtime_sec: Optional[int] = None,
-        priority: int = 5, deadline_ts: Optional[str] = None, max_cpu_pct: int = 90,
-        max_mem_mb: int = 0, min_vram_mb: int = 0
-    ):
-        return await do_scheduler_enqueue(EnqueueInput(
-            name=name, command=command, requires_gpu=requires_gpu, est_runtime_sec=est_runtime_sec,
-            priority=priority, deadline_ts=deadline_ts, max_cpu_pct=max_cpu_pct,
-            max_mem_mb=max_mem_mb, min_vram_mb=min_vram_mb
-        ))
-
-    @server.tool(name="scheduler.list", description="List tasks and states. state=any for all.")
-    async def _scheduler_list(state: str = "any"):
-        return await do_scheduler_list(ListInput(state=state))
-
-    @server.tool(name="scheduler.cancel", description="Cancel a queued or running task.")
-    async def _scheduler_cancel(task_id: str):
-        return await do_scheduler_cancel(CancelInput(task_id=task_id))
-
-    @server.tool(name="scheduler.policy_set", description="Activate/modify policy rules (simple JSON).")
-    async def _scheduler_policy_set(name: str, rules: Dict[str, Any]):
-        return await do_scheduler_policy_set(PolicySetInput(name=name, rules=rules))
-
-    @server.tool(name="scheduler.simulate",
-                 description="Given current metrics + queue, return a proposed start time for each task and reasoning.")
-    async def _scheduler_simulate(what_if: Optional[Dict[str, Any]] = None):
-        return await do_scheduler_simulate(SimulateInput(what_if=what_if))
-
-    @server.tool(name="usage.stats", description="Return LLM usage metrics/counters.")
-    async def _usage_stats():
-        return await do_usage_stats()
-
+    for name, description, model, func in TOOLS:
+        if HAS_TOOL_CLASS:
+            # Older API path (Tool class available)
+            server.add_tool(Tool(name=name, description=description, input_model=model, func=func))
+        else:
+            # Newer API path (decorator style, no Tool class)
+            server.tool(name=name, description=description)(_wrap(model, func))
     return server
 
 
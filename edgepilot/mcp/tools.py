@@ -1,10 +1,12 @@
 # edgepilot/mcp/tools.py
 from __future__ import annotations
 
-from typing import Dict, Any
+import asyncio
+import time
+from typing import Dict, Any, Tuple
 
 from .schemas import (
-    SnapshotInput, StreamStartInput, StreamStopInput, RunStartInput, RunEndInput,
+    SnapshotInput, StreamStartInput, StreamStopInput, StreamNextInput, RunStartInput, RunEndInput,
     EnqueueInput, ListInput, CancelInput, PolicySetInput, SimulateInput,
 )
 from ..metrics import get_metrics_service
@@ -12,9 +14,21 @@ from ..scheduler import get_scheduler
 from ..usage import usage_stats
 
 
+# Snapshot calls for the same arguments within this window share one collection
+_COALESCE_SEC = 0.2
+_inflight: Dict[Tuple[bool, int], Tuple[float, asyncio.Future]] = {}
+
+
 async def do_metrics_snapshot(params: SnapshotInput) -> Dict[str, Any]:
-    svc = get_metrics_service()
-    return svc.snapshot(include_processes=params.include_processes, top_n=params.top_n)
+    key = (params.include_processes, params.top_n)
+    now = time.monotonic()
+    entry = _inflight.get(key)
+    if entry is None or now - entry[0] >= _COALESCE_SEC:
+        svc = get_metrics_service()
+        fut = asyncio.ensure_future(svc.snapshot_async(include_processes=params.include_processes, top_n=params.top_n))
+        entry = _inflight[key] = (now, fut)
+    # shield: one caller being cancelled must not cancel the collection the others await
+    return await asyncio.shield(entry[1])
 
 
 async def do_metrics_stream_start(params: StreamStartInput) -> Dict[str, Any]:
@@ -23,6 +37,15 @@ async def do_metrics_stream_start(params: StreamStartInput) -> Dict[str, Any]:
     return {"stream_id": sid}
 
 
+async def do_metrics_stream_next(params: StreamNextInput) -> Dict[str, Any]:
+    svc = get_metrics_service()
+    try:
+        sample = await asyncio.wait_for(svc.stream_next(params.stream_id), params.timeout_sec)
+    except asyncio.TimeoutError:
+        sample = None
+    return {"stream_id": params.stream_id, "sample": sample}
+
+
 async def do_metrics_stream_stop(params: StreamStopInput) -> Dict[str, Any]:
     svc = get_metrics_service()
     stopped = svc.stop_stream(params.stream_id)
@@ -45,13 +68,20 @@ async def do_scheduler_enqueue(params: EnqueueInput) -> Dict[str, Any]:
     return {"task_id": t.id, "state": t.state}
 
 
+_LIST_FIELDS = ("id", "name", "state", "priority", "command", "started_at", "ended_at", "pid", "log_path")
+
+
 async def do_scheduler_list(params: ListInput) -> Any:
     sch = get_scheduler()
-    rows = sch.list(state=params.state)
-    return [ {"id": r.id, "name": r.name, "state": r.state, "priority": r.priority, "command": r.command,
-              "started_at": r.started_at.isoformat() if r.started_at else None,
-              "ended_at": r.ended_at.isoformat() if r.ended_at else None,
-              "pid": r.pid, "log_path": r.log_path } for r in rows ]
+    out = []
+    # Column tuples straight from SQL; only the two datetimes need converting
+    for r in sch.list_rows(state=params.state, fields=_LIST_FIELDS):
+        d = dict(zip(_LIST_FIELDS, r))
+        started, ended = r[5], r[6]
+        d["started_at"] = started.isoformat() if started else None
+        d["ended_at"] = ended.isoformat() if ended else None
+        out.append(d)
+    return out
 
 
 async def do_scheduler_cancel(params: CancelInput) -> Dict[str, Any]:
@@ -1,4 +1,4 @@
 # edgepilot/metrics/__init__.py
-from .collector import MetricsService, get_metrics_service
+from .collector import MetricsService, get_metrics_service, llm_view
 
-__all__ = ["MetricsService", "get_metrics_service"]
+__all__ = ["MetricsService", "get_metrics_service", "llm_view"]
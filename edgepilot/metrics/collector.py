@@ -2,30 +2,116 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import atexit
+import functools
+import heapq
+import operator
 import os
 import platform
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Callable, List
+from typing import Any, Dict, Optional, Callable, List, NamedTuple, Tuple
+import orjson
 import psutil
+from sqlalchemy import insert
 
 from ..config import get_config
 from ..db import session_scope, init_db
 from ..models import Metric, ProcessMetric, Run
+from . import proc_linux
 from .gpu_linux import read_nvidia_smi
 from .power_macos import read_powermetrics
 
 
+# Per-process fields read in one oneshot() pass; io_counters isn't implemented on macOS
+_PROC_ATTRS = ["name", "cmdline", "num_threads", "cpu_percent", "memory_info"] + (
+    ["io_counters"] if hasattr(psutil.Process, "io_counters") else []
+)
+# Once a pid's cmdline is cached it isn't read again
+_PROC_ATTRS_NO_CMDLINE = [a for a in _PROC_ATTRS if a != "cmdline"]
+
+
+# Snapshot sections kept in Metric.json_detail
+_DETAIL_KEYS = ("gpu", "power")
+
+
 def utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _nest(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """Wire/API shape of a collected snapshot: net and disk counters grouped under their own keys."""
+    snap = {
+        "ts": flat["ts"],
+        "cpu_total_pct": flat["cpu_total_pct"],
+        "mem_used_bytes": flat["mem_used_bytes"],
+        "mem_total_bytes": flat["mem_total_bytes"],
+        "swap_used_bytes": flat["swap_used_bytes"],
+        "net": {"rx_bytes": flat["net_rx_bytes"], "tx_bytes": flat["net_tx_bytes"]},
+        "disk": {"read_bytes": flat["disk_read_bytes"], "write_bytes": flat["disk_write_bytes"]},
+        "gpu": flat["gpu"],
+        "power": flat["power"],
+    }
+    if "processes" in flat:
+        snap["processes"] = flat["processes"]
+    return snap
+
+
+def llm_view(snap: Dict[str, Any], top_n: int = 5) -> Dict[str, Any]:
+    """The part of a (wire-shaped) snapshot worth putting in an LLM prompt: load, memory, GPU headroom,
+    power and the top processes by name; no cmdlines, io or cumulative counters."""
+    view: Dict[str, Any] = {
+        "cpu_total_pct": snap["cpu_total_pct"],
+        "mem_used_bytes": snap["mem_used_bytes"],
+        "mem_total_bytes": snap.get("mem_total_bytes"),
+        "swap_used_bytes": snap["swap_used_bytes"],
+    }
+    gpu = snap.get("gpu") or {}
+    if gpu.get("available"):
+        view["gpu"] = {"util_pct": gpu["util_pct"], "mem_free_bytes": gpu["mem_total_bytes"] - gpu["mem_used_bytes"]}
+    power = snap.get("power") or {}
+    if power.get("available"):
+        view["power"] = {k: v for k, v in power.items() if k != "available"}
+    procs = snap.get("processes")
+    if procs:
+        view["processes"] = [{"name": p["name"], "cpu_pct": round(p["cpu_pct"], 1), "rss_bytes": p["rss_bytes"]}
+                             for p in procs[:top_n]]
+    return view
+
+
+class ProcRow(NamedTuple):
+    """One sampled process. Every process gets a tuple; only the top-N become snapshot dicts."""
+    pid: int
+    name: str
+    cpu_pct: float
+    rss_bytes: int
+    io_read_bytes: int
+    io_write_bytes: int
+    threads: int
+    cmdline: str
+
+
+# top-N ordering: cpu then mem
+_PROC_RANK = operator.itemgetter(2, 3)
+
+
+# snapshot() calls with the same arguments within this window (scheduler tick + simulate, UI reruns)
+# share one collection and one top-N process pass
+_SNAPSHOT_TTL_SEC = 0.5
+
+# Samples a stream subscriber may fall behind by before the oldest are dropped
+_STREAM_QUEUE_MAX = 8
+
+
 @dataclass
 class Stream:
     interval: float
     include_processes: bool
-    task: asyncio.Task
+    queue: asyncio.Queue
+    next_at: float = 0.0
 
 
 class MetricsService:
@@ -35,12 +121,36 @@ class MetricsService:
         self.cfg = get_config()
         self.active_run_id: Optional[str] = None
         self._run_task: Optional[asyncio.Task] = None
+        # The run loop's current _sample() on the executor
+        self._run_sample: Optional[Future] = None
         self._streams: Dict[str, Stream] = {}
+        # (include_processes, top_n) -> (monotonic, snapshot) of the latest snapshot() call with those args
+        self._snap_memo: Dict[Tuple[bool, int], Tuple[float, Dict[str, Any]]] = {}
+        # One collection task feeds every stream's queue
+        self._producer: Optional[asyncio.Task] = None
+        # Process handles kept across samples so cpu_percent() deltas carry over between calls
+        self._proc_cache: Dict[int, psutil.Process] = {}
+        # Joined/truncated argv per pid; a process's cmdline doesn't change between samples
+        self._cmdline_cache: Dict[int, str] = {}
+        # Linux: utime+stime per pid from the previous /proc scan
+        self._prev_ticks: Dict[int, int] = {}
+        self._prev_ticks_at = 0.0
+        # Long-lived threads for blocking collection/persistence driven from async loops
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="edgepilot-metrics")
+        # Run samples waiting to be written in one transaction (see _persist_snapshot)
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_procs: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush_pending)
         init_db()
 
     # ---------- Core collection ----------
 
-    def _collect_snapshot(self, include_processes: bool = False, top_n: int = 15) -> Dict[str, Any]:
+    def _collect_snapshot(self, include_processes: bool = False, top_n: int = 15,
+                          now: Optional[datetime] = None) -> Dict[str, Any]:
+        if now is None:
+            now = datetime.now(timezone.utc)
         vm = psutil.virtual_memory()
         swap = psutil.swap_memory()
         cpu_pct = psutil.cpu_percent(interval=None)
@@ -48,12 +158,16 @@ class MetricsService:
         disk = psutil.disk_io_counters()
 
         snapshot: Dict[str, Any] = {
-            "ts": utcnow_iso(),
+            "ts": now.isoformat(),
             "cpu_total_pct": float(cpu_pct),
             "mem_used_bytes": int(vm.used),
+            "mem_total_bytes": int(vm.total),
             "swap_used_bytes": int(swap.used),
-            "net": {"rx_bytes": int(net.bytes_recv), "tx_bytes": int(net.bytes_sent)},
-            "disk": {"read_bytes": int(disk.read_bytes), "write_bytes": int(disk.write_bytes)},
+            # Flat, named like the Metric columns; snapshot() nests them for the wire shape
+            "net_rx_bytes": int(net.bytes_recv),
+            "net_tx_bytes": int(net.bytes_sent),
+            "disk_read_bytes": int(disk.read_bytes),
+            "disk_write_bytes": int(disk.write_bytes),
             "gpu": {"available": False},
             "power": {"available": False},
         }
@@ -79,64 +193,185 @@ class MetricsService:
 
         # Optional power (macOS)
         if self.cfg.metrics.enable_power and platform.system().lower() == "darwin":
-            p = read_powermetrics()
+            p = read_powermetrics(use_stream=self.cfg.metrics.powermetrics_stream,
+                                  interval_ms=int(self.cfg.metrics.stream_interval * 1000))
             if p.get("available"):
                 snapshot["power"] = {"available": True, **{k: v for k, v in p.items() if k != "available"}}
 
         # Processes
-        procs: List[Dict[str, Any]] = []
         if include_processes:
-            for p in psutil.process_iter(attrs=["pid", "name", "cmdline", "num_threads"]):
-                try:
-                    with p.oneshot():
-                        cpu = p.cpu_percent(interval=None)  # since last call
-                        mem = p.memory_info().rss
-                        io = p.io_counters() if hasattr(p, "io_counters") else None
-                        procs.append({
-                            "pid": p.pid,
-                            "name": p.info.get("name") or "",
-                            "cpu_pct": float(cpu),
-                            "rss_bytes": int(mem),
-                            "io_read_bytes": int(getattr(io, "read_bytes", 0) or 0),
-                            "io_write_bytes": int(getattr(io, "write_bytes", 0) or 0),
-                            "threads": int(p.info.get("num_threads") or 0),
-                            "cmdline": " ".join(p.info.get("cmdline") or [])[:512],
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            # sort by cpu then mem
-            procs.sort(key=lambda x: (x["cpu_pct"], x["rss_bytes"]), reverse=True)
-            procs = procs[:top_n]
-            snapshot["processes"] = procs
+            if proc_linux.AVAILABLE:
+                top = self._top_procs_linux(top_n)
+            else:
+                top = self._top_procs_psutil(top_n)
+            snapshot["processes"] = [r._asdict() for r in top]
 
         return snapshot
 
+    def _top_procs_psutil(self, top_n: int) -> List[ProcRow]:
+        procs: List[ProcRow] = []
+        cache = self._proc_cache
+        cmdlines = self._cmdline_cache
+        pids = psutil.pids()
+        for pid in pids:
+            p = cache.get(pid)
+            try:
+                if p is None:
+                    p = cache[pid] = psutil.Process(pid)
+                cmdline = cmdlines.get(pid)
+                # cpu_percent is relative to this handle's previous call
+                info = p.as_dict(attrs=_PROC_ATTRS if cmdline is None else _PROC_ATTRS_NO_CMDLINE)
+            except psutil.NoSuchProcess:
+                cache.pop(pid, None)
+                cmdlines.pop(pid, None)
+                continue
+            except psutil.AccessDenied:
+                continue
+            mem = info["memory_info"]
+            if mem is None:
+                continue
+            io = info.get("io_counters")
+            if cmdline is None:
+                # None (access denied) isn't cached, so it's retried next sample
+                argv = info["cmdline"]
+                cmdline = " ".join(argv or [])[:512]
+                if argv is not None:
+                    cmdlines[pid] = cmdline
+            procs.append(ProcRow(
+                pid,
+                info["name"] or "",
+                float(info["cpu_percent"] or 0.0),
+                int(mem.rss),
+                int(getattr(io, "read_bytes", 0) or 0),
+                int(getattr(io, "write_bytes", 0) or 0),
+                int(info["num_threads"] or 0),
+                cmdline,
+            ))
+        # Forget handles for processes that have exited
+        # pop(): another thread collecting at the same time may have dropped it already
+        for pid in cache.keys() - set(pids):
+            cache.pop(pid, None)
+            cmdlines.pop(pid, None)
+        # top N by cpu then mem, without sorting the whole table
+        return heapq.nlargest(top_n, procs, key=_PROC_RANK)
+
+    def _top_procs_linux(self, top_n: int) -> List[ProcRow]:
+        # One /proc/<pid>/stat read per process; cpu_pct from tick deltas against the previous scan
+        now = time.monotonic()
+        elapsed = now - self._prev_ticks_at
+        prev = self._prev_ticks
+        ticks: Dict[int, int] = {}
+        scale = 100.0 / (proc_linux.CLK_TCK * elapsed) if prev and elapsed > 0 else 0.0
+        rows = []
+        for pid in proc_linux.list_pids():
+            st = proc_linux.read_stat(pid)
+            if st is None:
+                continue
+            name, t, threads, rss = st
+            ticks[pid] = t
+            # Same as psutil: 0.0 the first time a process is seen
+            last = prev.get(pid)
+            cpu = (t - last) * scale if last is not None else 0.0
+            rows.append((pid, name, cpu, rss, threads))
+        self._prev_ticks = ticks
+        self._prev_ticks_at = now
+        cmdlines = self._cmdline_cache
+        for pid in cmdlines.keys() - ticks.keys():
+            cmdlines.pop(pid, None)
+        # cmdline and io are only read for the processes that make the top N
+        top: List[ProcRow] = []
+        for pid, name, cpu, rss, threads in heapq.nlargest(top_n, rows, key=_PROC_RANK):
+            rd, wr = proc_linux.read_io(pid)
+            cmdline = cmdlines.get(pid)
+            if cmdline is None:
+                cmdline = cmdlines[pid] = proc_linux.read_cmdline(pid)
+            top.append(ProcRow(pid, name, cpu, rss, rd, wr, threads, cmdline))
+        return top
+
     # ---------- Public API ----------
 
     def snapshot(self, include_processes: bool = False, top_n: int = 15) -> Dict[str, Any]:
-        snap = self._collect_snapshot(include_processes, top_n)
+        key = (include_processes, top_n)
+        hit = self._snap_memo.get(key)
+        if hit is not None and time.monotonic() - hit[0] < _SNAPSHOT_TTL_SEC:
+            return hit[1]
+        snap = _nest(self._sample(include_processes, top_n))
+        self._snap_memo[key] = (time.monotonic(), snap)
+        return snap
+
+    def _sample(self, include_processes: bool, top_n: int) -> Dict[str, Any]:
+        """Collect a flat snapshot and persist it if a run is active."""
+        # Read once: end_run() may clear it while this collects
+        run_id = self.active_run_id
+        now = datetime.now(timezone.utc)
+        snap = self._collect_snapshot(include_processes, top_n, now)
         # If a run is active, persist summary + processes
-        if self.active_run_id:
-            self._persist_snapshot(self.active_run_id, snap)
+        if run_id:
+            self._persist_snapshot(run_id, snap, ts=now)
         return snap
 
-    def start_stream(self, interval: float = 2.0, include_processes: bool = False) -> str:
-        """Start a background task that simply collects at a cadence; used by MCP to demonstrate streaming ID."""
-        async def _loop():
-            while True:
-                _ = self.snapshot(include_processes=include_processes, top_n=self.cfg.metrics.process_top_n)
-                await asyncio.sleep(interval)
+    def snapshot_for_llm(self, top_n: int = 5) -> Dict[str, Any]:
+        """Trimmed snapshot for prompts (see llm_view)."""
+        return llm_view(self.snapshot(include_processes=True, top_n=top_n), top_n)
 
+    async def snapshot_async(self, include_processes: bool = False, top_n: int = 15) -> Dict[str, Any]:
+        """snapshot() on the service's executor, so psutil/subprocess/DB work doesn't block the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self.snapshot, include_processes, top_n))
+
+    def start_stream(self, interval: float = 2.0, include_processes: bool = False) -> str:
+        """Subscribe to the shared sampling task; samples are queued for stream_next()."""
         stream_id = f"s-{utcnow_iso()}"
-        self._streams[stream_id] = Stream(interval=interval, include_processes=include_processes, task=asyncio.create_task(_loop()))
+        self._streams[stream_id] = Stream(interval=interval, include_processes=include_processes,
+                                          queue=asyncio.Queue(maxsize=_STREAM_QUEUE_MAX))
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._produce())
         return stream_id
 
     def stop_stream(self, stream_id: str) -> bool:
         st = self._streams.pop(stream_id, None)
-        if st:
-            st.task.cancel()
-            return True
-        return False
+        if st is None:
+            return False
+        if not self._streams and self._producer is not None:
+            self._producer.cancel()
+            self._producer = None
+        return True
+
+    async def stream_next(self, stream_id: str) -> Optional[Dict[str, Any]]:
+        """Wait for the stream's next sample; None if the stream doesn't exist."""
+        st = self._streams.get(stream_id)
+        if st is None:
+            return None
+        return await st.queue.get()
+
+    async def _produce(self) -> None:
+        # One snapshot per tick no matter how many streams; each stream gets it on its own cadence
+        loop = asyncio.get_running_loop()
+        while self._streams:
+            now = loop.time()
+            # Streams nearly due ride along, so subscribers that joined at offsets share ticks
+            due = [st for st in self._streams.values() if st.next_at - now <= st.interval / 4]
+            if due:
+                include = any(st.include_processes for st in due)
+                # Bypass the snapshot() memo: a sub-TTL interval must still get a fresh sample each tick
+                snap = _nest(await loop.run_in_executor(
+                    self._executor, self._sample, include, self.cfg.metrics.process_top_n))
+                lean = None
+                for st in due:
+                    if include and not st.include_processes:
+                        if lean is None:
+                            lean = {k: v for k, v in snap.items() if k != "processes"}
+                        item = lean
+                    else:
+                        item = snap
+                    if st.queue.full():
+                        # Slow consumer: drop its oldest sample rather than block the others
+                        st.queue.get_nowait()
+                    st.queue.put_nowait(item)
+                    st.next_at = now + st.interval
+            if self._streams:
+                wake = min(st.next_at for st in self._streams.values())
+                await asyncio.sleep(max(0.0, wake - loop.time()))
 
     # ---------- Runs ----------
 
@@ -155,7 +390,10 @@ class MetricsService:
 
         async def _sample_loop():
             while self.active_run_id == run_id:
-                _ = self.snapshot(include_processes=True, top_n=self.cfg.metrics.process_top_n)
+                # Samples are only persisted here, so the wire-shaped copy is never built; the concurrent
+                # future is kept because cancelling this task doesn't stop a sample already on a thread
+                self._run_sample = self._executor.submit(self._sample, True, self.cfg.metrics.process_top_n)
+                await asyncio.wrap_future(self._run_sample)
                 await asyncio.sleep(sampling)
 
         self._run_task = asyncio.create_task(_sample_loop())
@@ -170,45 +408,76 @@ class MetricsService:
             self._run_task.cancel()
         self._run_task = None
         self.active_run_id = None
+        # Let an in-flight sample queue its row before _summarize_run flushes
+        inflight, self._run_sample = self._run_sample, None
+        if inflight is not None and not inflight.done():
+            await asyncio.wait([asyncio.wrap_future(inflight)])
         return await self._summarize_run(run_id)
 
     # ---------- Internals ----------
 
-    def _persist_snapshot(self, run_id: str, snap: Dict[str, Any]) -> None:
-        init_db()
+    def _persist_snapshot(self, run_id: str, snap: Dict[str, Any], ts: Optional[datetime] = None) -> None:
+        # Callers that collected the snapshot pass its datetime; parse the wire string otherwise
+        if ts is None:
+            ts = datetime.fromisoformat(snap["ts"])
+        row = {
+            "ts": ts,
+            "cpu_total_pct": snap["cpu_total_pct"],
+            "mem_used_bytes": snap["mem_used_bytes"],
+            "swap_used_bytes": snap["swap_used_bytes"],
+            "net_rx_bytes": snap["net_rx_bytes"],
+            "net_tx_bytes": snap["net_tx_bytes"],
+            "disk_read_bytes": snap["disk_read_bytes"],
+            "disk_write_bytes": snap["disk_write_bytes"],
+            "gpu_util_pct": snap.get("gpu", {}).get("util_pct"),
+            "gpu_mem_used_bytes": snap.get("gpu", {}).get("mem_used_bytes"),
+            "power_watts": snap.get("power", {}).get("watts"),
+            "battery_pct": snap.get("power", {}).get("battery_pct"),
+            # Only what has no column of its own (GPU totals, plugged state); processes
+            # go to process_metrics below and scalar metrics are already columns
+            "json_detail": orjson.dumps({k: snap[k] for k in _DETAIL_KEYS if k in snap}).decode(),
+            "run_id": run_id,
+        }
+        # Store process top N (not required every time; we store when included).
+        procs = [
+            {"ts": ts, "pid": p["pid"], "name": p["name"], "cpu_pct": p["cpu_pct"],
+             "rss_bytes": p["rss_bytes"], "io_read_bytes": p["io_read_bytes"],
+             "io_write_bytes": p["io_write_bytes"], "threads": p["threads"], "cmdline": p.get("cmdline")}
+            for p in snap.get("processes") or ()
+        ]
+        # Queue instead of committing per sample; one transaction per flush interval
+        with self._pending_lock:
+            self._pending.append(row)
+            self._pending_procs.extend(procs)
+            due = time.monotonic() - self._last_flush >= self.cfg.metrics.flush_interval_sec
+        if due:
+            self.flush_pending()
+
+    def flush_pending(self) -> None:
+        """Write buffered run samples with one executemany INSERT per table."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+            procs, self._pending_procs = self._pending_procs, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return
         with session_scope() as s:
-            m = Metric(
-                ts=datetime.fromisoformat(snap["ts"]),
-                cpu_total_pct=snap["cpu_total_pct"],
-                mem_used_bytes=snap["mem_used_bytes"],
-                swap_used_bytes=snap["swap_used_bytes"],
-                net_rx_bytes=snap["net"]["rx_bytes"],
-                net_tx_bytes=snap["net"]["tx_bytes"],
-                disk_read_bytes=snap["disk"]["read_bytes"],
-                disk_write_bytes=snap["disk"]["write_bytes"],
-                gpu_util_pct=snap.get("gpu", {}).get("util_pct"),
-                gpu_mem_used_bytes=snap.get("gpu", {}).get("mem_used_bytes"),
-                power_watts=None,
-                battery_pct=snap.get("power", {}).get("battery_pct"),
-                json_detail=json.dumps({k: v for k, v in snap.items() if k not in {"ts"}})[:65535],
-                run_id=run_id,
-            )
-            s.add(m)
-            # Store process top N (not required every time; we store when included)
-            for p in snap.get("processes", []):
-                s.add(ProcessMetric(
-                    ts=m.ts, pid=p["pid"], name=p["name"], cpu_pct=p["cpu_pct"],
-                    rss_bytes=p["rss_bytes"], io_read_bytes=p["io_read_bytes"], io_write_bytes=p["io_write_bytes"],
-                    threads=p["threads"], cmdline=p.get("cmdline")
-                ))
+            s.execute(insert(Metric), rows)
+            if procs:
+                s.execute(insert(ProcessMetric), procs)
 
     async def _summarize_run(self, run_id: str) -> Dict[str, Any]:
-        from sqlalchemy import select
-        init_db()
+        from sqlalchemy import func, select
+        # Samples still in the buffer belong to this summary
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.flush_pending)
         with session_scope() as s:
-            q = select(Metric).where(Metric.run_id == run_id).order_by(Metric.ts)
-            rows = list(s.execute(q).scalars())
-            if not rows:
+            # Aggregate in SQLite; only one row comes back however long the run was
+            n, avg_cpu, avg_mem_used, gpu_samples = s.execute(
+                select(func.count(), func.avg(Metric.cpu_total_pct), func.avg(Metric.mem_used_bytes),
+                       func.count(Metric.gpu_util_pct))
+                .where(Metric.run_id == run_id)
+            ).one()
+            if not n:
                 # Update run status cleanly
                 run = s.get(Run, run_id)
                 if run:
@@ -216,10 +485,8 @@ class MetricsService:
                     run.ended_at = datetime.now(timezone.utc)
                 return {"ended_at": utcnow_iso(), "summary": {}, "report_text": "No samples collected."}
 
-            avg_cpu = sum(r.cpu_total_pct for r in rows) / len(rows)
-            avg_mem_used = sum(r.mem_used_bytes for r in rows) / len(rows)
             avg_mem_gb = avg_mem_used / (1024**3)
-            gpu_detected = any(r.gpu_util_pct is not None for r in rows)
+            gpu_detected = gpu_samples > 0
             top_proc_stmt = """
 Top processes seen:
 - (Sampled) check the process_metrics table for details via the UI/CLI.
@@ -231,14 +498,14 @@ Top processes seen:
                 "avg_cpu_pct": round(avg_cpu, 2),
                 "avg_mem_used_gb": round(avg_mem_gb, 2),
                 "gpu_detected": gpu_detected,
-                "samples": len(rows),
+                "samples": n,
             }
 
             run = s.get(Run, run_id)
             if run:
                 run.status = "ended"
                 run.ended_at = datetime.now(timezone.utc)
-                run.summary_json = json.dumps(summary)
+                run.summary_json = orjson.dumps(summary).decode()
 
         return {"ended_at": utcnow_iso(), "summary": summary, "report_text": report}
 
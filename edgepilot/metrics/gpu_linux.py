@@ -2,11 +2,52 @@
 from __future__ import annotations
 
 import subprocess
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# pynvml module once nvmlInit() succeeded, False if NVML is unavailable, None before the first try
+_nvml: Any = None
+
+
+def _get_nvml() -> Optional[Any]:
+    global _nvml
+    if _nvml is None:
+        try:
+            import pynvml  # type: ignore  # optional: pip install edgepilot[gpu]
+            pynvml.nvmlInit()
+            _nvml = pynvml
+        except Exception:
+            _nvml = False
+    return _nvml or None
+
+
+def _read_nvml(nvml: Any) -> Dict[str, Any]:
+    utils = []
+    mem_used = 0
+    mem_total = 0
+    for i in range(nvml.nvmlDeviceGetCount()):
+        h = nvml.nvmlDeviceGetHandleByIndex(i)
+        utils.append(float(nvml.nvmlDeviceGetUtilizationRates(h).gpu))
+        mem = nvml.nvmlDeviceGetMemoryInfo(h)
+        mem_used += int(mem.used)
+        mem_total += int(mem.total)
+    if not utils:
+        return {"available": False}
+    return {
+        "available": True,
+        "util_pct": sum(utils) / len(utils),
+        "mem_used_bytes": mem_used,
+        "mem_total_bytes": mem_total,
+    }
 
 
 def read_nvidia_smi() -> Dict[str, Any]:
-    """Return GPU util/memory using nvidia-smi if present. Fail gracefully otherwise."""
+    """Return GPU util/memory via NVML (in-process) or nvidia-smi if present. Fail gracefully otherwise."""
+    nvml = _get_nvml()
+    if nvml is not None:
+        try:
+            return _read_nvml(nvml)
+        except Exception:
+            pass
     try:
         cmd = [
             "nvidia-smi",
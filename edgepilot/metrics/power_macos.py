@@ -1,26 +1,112 @@
 # edgepilot/metrics/power_macos.py
 from __future__ import annotations
 
+import atexit
 import platform
+import re
 import subprocess
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
 
+# Battery % moves on a scale of minutes; reuse the last reading instead of forking pmset every sample
+_CACHE_TTL_SEC = 10.0
+_cache: Optional[Tuple[float, Dict[str, Any]]] = None
 
-def read_powermetrics() -> Dict[str, Any]:
-    """Parse minimal power data on macOS if powermetrics is accessible; else unavailable."""
+_BATT_RE = re.compile(r"(\d{1,3})%")
+
+# powermetrics text output (battery + cpu_power samplers)
+_PM_PATTERNS = (
+    ("battery_pct", re.compile(r"percent_charge:\s*(\d+)"), 1.0),
+    ("cpu_watts", re.compile(r"^CPU Power:\s*(\d+)\s*mW"), 0.001),
+    ("watts", re.compile(r"^Combined Power \(CPU \+ GPU \+ ANE\):\s*(\d+)\s*mW"), 0.001),
+    ("watts", re.compile(r"package power \(CPUs\+GT\+SA\):\s*([\d.]+)\s*W"), 1.0),
+)
+
+
+class PowermetricsStream:
+    """One long-running `powermetrics` process; a reader thread keeps the latest parsed values."""
+
+    def __init__(self, interval_ms: int = 1000):
+        self.interval_ms = interval_ms
+        self._proc: Optional[subprocess.Popen] = None
+        self._latest: Optional[Dict[str, Any]] = None
+        self.failed = False
+
+    def start(self) -> None:
+        # -n: never prompt; without passwordless sudo the process just exits and we stay on pmset
+        cmd = ["sudo", "-n", "powermetrics", "-i", str(self.interval_ms), "-n", "0",
+               "--samplers", "battery,cpu_power"]
+        try:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                          stdin=subprocess.DEVNULL, text=True, bufsize=1)
+        except OSError:
+            self.failed = True
+            return
+        atexit.register(self.stop)
+        threading.Thread(target=self._reader, name="edgepilot-powermetrics", daemon=True).start()
+
+    def _reader(self) -> None:
+        assert self._proc is not None and self._proc.stdout is not None
+        for line in self._proc.stdout:
+            for key, pattern, scale in _PM_PATTERNS:
+                m = pattern.search(line)
+                if m:
+                    # Replace, don't mutate: latest() readers may hold the previous dict
+                    self._latest = {**(self._latest or {"available": True}), key: float(m.group(1)) * scale}
+                    break
+        self.failed = True
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        frame = self._latest
+        return dict(frame) if frame is not None else None
+
+    def stop(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+
+
+_stream: Optional[PowermetricsStream] = None
+# Snapshots are collected on several threads at once; only one of them may start powermetrics
+_stream_lock = threading.Lock()
+
+
+def read_powermetrics(use_stream: bool = False, interval_ms: int = 1000) -> Dict[str, Any]:
+    """Parse minimal power data on macOS if powermetrics is accessible; else unavailable.
+
+    use_stream reads the latest frame of a persistent `sudo -n powermetrics`, falling back to pmset
+    until the first frame arrives or if sudo is refused.
+    """
+    global _cache, _stream
     if platform.system().lower() != "darwin":
         return {"available": False}
+    if use_stream:
+        if _stream is None:
+            with _stream_lock:
+                if _stream is None:
+                    stream = PowermetricsStream(interval_ms)
+                    stream.start()
+                    _stream = stream
+        if not _stream.failed:
+            frame = _stream.latest()
+            if frame is not None:
+                return frame
+    if _cache is not None and time.monotonic() - _cache[0] < _CACHE_TTL_SEC:
+        return dict(_cache[1])
+    res = _read_pmset()
+    _cache = (time.monotonic(), res)
+    return dict(res)
+
+
+def _read_pmset() -> Dict[str, Any]:
     try:
         # A quick and safe call: ask pmset for battery %
         out = subprocess.check_output(["pmset", "-g", "batt"], text=True, timeout=2)
         # Format e.g., " - InternalBattery-0 (id=xxxx)    87%; discharging; ..."
-        pct = None
-        for token in out.replace(";", " ").replace("%", " ").split():
-            if token.isdigit():
-                n = int(token)
-                if 0 <= n <= 100:
-                    pct = n
-                    break
+        m = _BATT_RE.search(out)
+        pct = int(m.group(1)) if m else None
+        if pct is not None and pct > 100:
+            pct = None
         return {"available": True, "battery_pct": pct}
     except Exception:
         return {"available": False}
@@ -0,0 +1,73 @@
+# edgepilot/metrics/proc_linux.py
+from __future__ import annotations
+
+import os
+import sys
+from typing import List, Optional, Tuple
+
+# Read /proc directly instead of through psutil.Process handles (Linux only)
+AVAILABLE = sys.platform.startswith("linux") and os.path.isdir("/proc")
+CLK_TCK = os.sysconf("SC_CLK_TCK") if AVAILABLE else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if AVAILABLE else 4096
+
+# Field offsets in /proc/<pid>/stat counted from the state field after "(comm)"
+_UTIME, _STIME, _NUM_THREADS, _RSS = 11, 12, 17, 21
+
+
+def _read(path: str, size: int = 4096) -> bytes:
+    # One open/read/close without a Python file object
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def list_pids() -> List[int]:
+    return [int(d) for d in os.listdir("/proc") if d.isdigit()]
+
+
+def read_stat(pid: int) -> Optional[Tuple[str, int, int, int]]:
+    """(name, utime+stime ticks, threads, rss bytes) from one read of /proc/<pid>/stat; None if it exited."""
+    try:
+        data = _read(f"/proc/{pid}/stat")
+    except OSError:
+        return None
+    # comm may itself contain spaces or parens; it ends at the last ")"
+    lp = data.find(b"(")
+    rp = data.rfind(b")")
+    if lp < 0 or rp < 0:
+        return None
+    fields = data[rp + 2:].split()
+    try:
+        return (
+            data[lp + 1:rp].decode("utf-8", "replace"),
+            int(fields[_UTIME]) + int(fields[_STIME]),
+            int(fields[_NUM_THREADS]),
+            int(fields[_RSS]) * _PAGE_SIZE,
+        )
+    except (IndexError, ValueError):
+        return None
+
+
+def read_cmdline(pid: int, limit: int = 512) -> str:
+    try:
+        data = _read(f"/proc/{pid}/cmdline", limit)
+    except OSError:
+        return ""
+    return data.rstrip(b"\0").replace(b"\0", b" ").decode("utf-8", "replace")
+
+
+def read_io(pid: int) -> Tuple[int, int]:
+    """(read_bytes, write_bytes); zeros when /proc/<pid>/io isn't readable (other users' processes)."""
+    try:
+        data = _read(f"/proc/{pid}/io")
+    except OSError:
+        return 0, 0
+    read_bytes = write_bytes = 0
+    for line in data.splitlines():
+        if line.startswith(b"read_bytes:"):
+            read_bytes = int(line[11:])
+        elif line.startswith(b"write_bytes:"):
+            write_bytes = int(line[12:])
+    return read_bytes, write_bytes
@@ -67,7 +67,8 @@ class Metric(Base):
     run: Mapped[Optional["Run"]] = relationship(back_populates="metrics")
 
 
-Index("ix_metrics_ts", Metric.ts)
+# Per-run range scans (run summaries)
+Index("ix_metrics_run_ts", Metric.run_id, Metric.ts)
 
 
 class ProcessMetric(Base):
@@ -85,9 +86,6 @@ class ProcessMetric(Base):
     cmdline: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
 
-Index("ix_process_metrics_ts", ProcessMetric.ts)
-
-
 class Task(Base):
     __tablename__ = "tasks"
     id: Mapped[str] = mapped_column(String, primary_key=True, default=task_id)
@@ -143,3 +141,8 @@ class Usage(Base):
     tokens_out: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     ok: Mapped[bool] = mapped_column(Boolean, default=True)
+
+
+# Time-range queries, and a covering index so usage totals scan it instead of the wide rows
+Index("ix_usage_ts", Usage.ts)
+Index("ix_usage_totals", Usage.prompt_len, Usage.tool_calls)
@@ -1,4 +1,4 @@
 # edgepilot/scheduler/__init__.py
-from .core import Scheduler, get_scheduler
+from .core import Scheduler, TaskColumns, get_scheduler
 
-__all__ = ["Scheduler", "get_scheduler"]
+__all__ = ["Scheduler", "TaskColumns", "get_scheduler"]
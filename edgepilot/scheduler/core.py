@@ -2,21 +2,29 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import heapq
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.orm import Session
 
 from ..config import get_config
 from ..db import session_scope, init_db
 from ..metrics import get_metrics_service
 from ..models import Task, ScheduleEvent, Policy
-from .policies import PRESETS, evaluate
-from .runner import start_subprocess, TaskHandle
+from .policies import PRESETS, CompiledRules, compile_rules, evaluate_compiled
+from .runner import start_subprocess, terminate, TaskHandle
+
+
+# Active policy is cached in-process; re-read after this long in case another process (CLI) changed it
+_RULES_TTL_SEC = 30.0
 
 
 def utcnow():
@@ -30,26 +38,66 @@ class QueueItem:
     task_id: str = field(compare=False)
 
 
+@dataclass
+class TaskColumns:
+    """Columnar (structure-of-arrays) view of task rows, one list per field."""
+    id: List[str] = field(default_factory=list)
+    name: List[str] = field(default_factory=list)
+    command: List[str] = field(default_factory=list)
+    state: List[str] = field(default_factory=list)
+    priority: List[int] = field(default_factory=list)
+    created_at: List[datetime] = field(default_factory=list)
+    started_at: List[Optional[datetime]] = field(default_factory=list)
+    ended_at: List[Optional[datetime]] = field(default_factory=list)
+    pid: List[Optional[int]] = field(default_factory=list)
+    log_path: List[Optional[str]] = field(default_factory=list)
+
+
+# Same order as the TaskColumns fields
+_TASK_COLUMNS = (Task.id, Task.name, Task.command, Task.state, Task.priority,
+                 Task.created_at, Task.started_at, Task.ended_at, Task.pid, Task.log_path)
+
+
 class Scheduler:
     """Simple local scheduler with policy checks."""
     def __init__(self):
         self.cfg = get_config()
         self.metrics = get_metrics_service()
         self._handles: Dict[str, TaskHandle] = {}
+        # Task ids whose child has exited but hasn't been reaped by _tick yet (filled by exit callbacks)
+        self._exited: set = set()
+        # Canceled-while-queued ids whose QueueItem is still in the heap (lazy deletion)
+        self._canceled: set = set()
+        # Children started and not yet exited; kept by _maybe_start_next/_on_child_exit
+        self._running_count = 0
         self._queue: List[QueueItem] = []
+        # enqueue()/cancel() run on API threadpool threads while _tick pops on the loop: every heap and
+        # tombstone mutation holds this (never across an await)
+        self._queue_lock = threading.Lock()
         self._bg_task: Optional[asyncio.Task] = None
         self._active: bool = False
+        # Set to wake the loop early (enqueue/cancel); _loop_ref lets other threads do that safely
+        self._wake: Optional[asyncio.Event] = None
+        self._loop_ref: Optional[asyncio.AbstractEventLoop] = None
+        self._rules_cache: Optional[Dict] = None
+        self._compiled_rules: Optional[CompiledRules] = None
+        self._rules_loaded_at = 0.0
+        self._rules_version = 0
         init_db()
         self._load_existing_queue()
 
     def _load_existing_queue(self):
         with session_scope() as s:
-            q = select(Task).where(Task.state == "queued")
-            for t in s.execute(q).scalars():
-                self._push_queue(t)
+            q = select(Task.priority, Task.created_at, Task.id).where(Task.state == "queued")
+            items = [QueueItem(priority=p, ts=c.timestamp(), task_id=i) for p, c, i in s.execute(q)]
+        # One O(n) heap build instead of n pushes
+        self._queue.extend(items)
+        heapq.heapify(self._queue)
 
     def _push_queue(self, t: Task):
-        heapq.heappush(self._queue, QueueItem(priority=t.priority, ts=t.created_at.timestamp(), task_id=t.id))
+        item = QueueItem(priority=t.priority, ts=t.created_at.timestamp(), task_id=t.id)
+        with self._queue_lock:
+            heapq.heappush(self._queue, item)
 
     # ---------- Public control ----------
 
@@ -57,6 +105,8 @@ class Scheduler:
         if self._bg_task:
             return
         self._active = True
+        self._wake = asyncio.Event()
+        self._loop_ref = asyncio.get_running_loop()
 
         async def _loop():
             while self._active:
@@ -64,8 +114,14 @@ class Scheduler:
                     await self._tick()
                 except Exception:
                     # Don't die silently; continue
-                    await asyncio.sleep(self.cfg.scheduler.queue_check_interval)
-                await asyncio.sleep(self.cfg.scheduler.queue_check_interval)
+                    pass
+                # Sleep until woken (enqueue/cancel/child exit); the timed recheck is only for deferred tasks
+                timeout = self.cfg.scheduler.queue_check_interval if self._queue else None
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
 
         self._bg_task = asyncio.create_task(_loop())
 
@@ -75,29 +131,48 @@ class Scheduler:
             self._bg_task.cancel()
             self._bg_task = None
 
+    def _notify(self):
+        """Wake the background loop now; callable from any thread (sync API routes run in a threadpool)."""
+        loop = self._loop_ref
+        if loop is None or self._wake is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wake.set()
+        else:
+            loop.call_soon_threadsafe(self._wake.set)
+
     # ---------- API ----------
 
     def enqueue(self, **payload) -> Task:
         init_db()
         with session_scope() as s:
-            t = Task(
-                name=payload.get("name", "task"),
-                command=payload["command"],
-                est_runtime_sec=payload.get("est_runtime_sec"),
-                requires_gpu=bool(payload.get("requires_gpu", False)),
-                min_vram_mb=int(payload.get("min_vram_mb", 0) or 0),
-                max_cpu_pct=int(payload.get("max_cpu_pct", 100) or 100),
-                max_mem_mb=int(payload.get("max_mem_mb", 0) or 0),
-                priority=int(payload.get("priority", 5) or 5),
-                deadline_ts=payload.get("deadline_ts"),
-                state="queued",
-            )
+            t = _new_task(payload)
             s.add(t)
             s.flush()
             s.add(ScheduleEvent(kind="enqueued", task_id=t.id, note=t.name))
             s.commit()
             self._push_queue(t)
-            return t
+        self._notify()
+        return t
+
+    def bulk_enqueue(self, payloads: Sequence[Dict[str, Any]]) -> List[Task]:
+        """enqueue() for many tasks: one transaction and one heapify."""
+        init_db()
+        with session_scope() as s:
+            tasks = [_new_task(p) for p in payloads]
+            s.add_all(tasks)
+            s.flush()
+            s.add_all([ScheduleEvent(kind="enqueued", task_id=t.id, note=t.name) for t in tasks])
+        items = [QueueItem(priority=t.priority, ts=t.created_at.timestamp(), task_id=t.id) for t in tasks]
+        with self._queue_lock:
+            self._queue.extend(items)
+            heapq.heapify(self._queue)
+        self._notify()
+        return tasks
 
     def list(self, state: Optional[str] = None) -> List[Task]:
         with session_scope() as s:
@@ -106,51 +181,85 @@ class Scheduler:
                 q = q.where(Task.state == state)
             return list(s.execute(q.order_by(Task.created_at)).scalars())
 
+    def list_count(self, state: Optional[str] = None) -> int:
+        q = select(func.count(Task.id))
+        if state and state != "any":
+            q = q.where(Task.state == state)
+        with session_scope() as s:
+            return s.scalar(q)
+
+    def list_rows(self, state: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Any]:
+        """Like list(), but selects plain column tuples (no ORM objects); fields defaults to TaskColumns' fields."""
+        cols = [getattr(Task, f) for f in fields] if fields else _TASK_COLUMNS
+        q = select(*cols)
+        if state and state != "any":
+            q = q.where(Task.state == state)
+        with session_scope() as s:
+            return s.execute(q.order_by(Task.created_at)).all()
+
+    def list_columns(self, state: Optional[str] = None) -> TaskColumns:
+        """list_rows() transposed into one list per column."""
+        rows = self.list_rows(state)
+        if not rows:
+            return TaskColumns()
+        return TaskColumns(*(list(col) for col in zip(*rows)))
+
     def cancel(self, task_id: str) -> bool:
+        ok = self._cancel(task_id)
+        if ok:
+            self._notify()
+        return ok
+
+    def _cancel(self, task_id: str) -> bool:
+        # Conditional UPDATEs instead of loading the Task row
         with session_scope() as s:
-            t = s.get(Task, task_id)
-            if not t:
-                return False
-            if t.state == "queued":
-                t.state = "canceled"
-                s.add(ScheduleEvent(kind="canceled", task_id=t.id, note="Canceled while queued"))
+            if _set_state(s, task_id, "queued", "canceled"):
+                s.add(ScheduleEvent(kind="canceled", task_id=task_id, note="Canceled while queued"))
+                with self._queue_lock:
+                    self._canceled.add(task_id)
                 return True
-            if t.state == "running":
-                # Best-effort terminate
-                ok = False
-                handle = self._handles.get(task_id)
-                if handle and handle.popen.poll() is None:
-                    try:
-                        handle.popen.terminate()
-                        ok = True
-                    except Exception:
-                        ok = False
-                t.state = "canceled"
-                s.add(ScheduleEvent(kind="canceled", task_id=t.id, note="Terminated"))
-                return ok
-        return False
+            if not _set_state(s, task_id, "running", "canceled"):
+                return False
+            s.add(ScheduleEvent(kind="canceled", task_id=task_id, note="Terminated"))
+        # Look up the handle only after the commit: a start in flight either registers its handle
+        # before this or re-reads "canceled" after registering it and terminates the child itself
+        handle = self._handles.get(task_id)
+        if handle and handle.proc.returncode is None:
+            # Best-effort terminate
+            try:
+                terminate(handle)
+            except Exception:
+                return False
+        return True
 
     def policy_set(self, name: str, rules: Dict) -> str:
         with session_scope() as s:
-            # Deactivate old
-            s.execute(update(Policy).values(active=False))
+            # Deactivate old (normally a single row)
+            s.execute(update(Policy).where(Policy.active.is_(True)).values(active=False))
             # Upsert
-            p = s.query(Policy).filter(Policy.name == name).one_or_none()
+            p = s.scalar(select(Policy).where(Policy.name == name))
             if p:
                 p.json_rules = json.dumps(rules)
                 p.active = True
             else:
                 p = Policy(name=name, json_rules=json.dumps(rules), active=True)
             s.add(p)
+        self._cache_rules(rules)
         return name
 
+    def _cache_rules(self, rules: Dict):
+        self._rules_cache = rules
+        self._compiled_rules = compile_rules(rules)
+        self._rules_loaded_at = time.monotonic()
+        self._rules_version += 1
+
     def simulate(self, what_if: Dict[str, any] | None = None) -> Dict[str, any]:
         """Very simple simulation: for queued tasks, return now or after 15m if can't start."""
         snap = self.metrics.snapshot(include_processes=False)
-        rules = self._active_rules()
+        rules = self._active_compiled_rules()
         plan = []
         for t in self.list(state="queued"):
-            can, reasons = evaluate(snap, _task_as_dict(t), rules)
+            can, reasons = evaluate_compiled(snap, t, rules)
             plan.append({
                 "task_id": t.id,
                 "start_at": datetime.now(timezone.utc).isoformat() if can else None,
@@ -161,70 +270,134 @@ class Scheduler:
     # ---------- Internals ----------
 
     async def _tick(self):
-        # Launch new tasks if capacity available
-        running = sum(1 for h in self._handles.values() if h.popen.poll() is None)
-        while running < self.cfg.scheduler.max_parallel and self._queue:
-            t = await self._maybe_start_next()
-            if not t:
-                break
-            running += 1
-
-        # Poll running tasks
-        to_remove = []
+        # Mostly tombstones: rebuild the heap without them, in place so no concurrent push is lost
+        if self._canceled and len(self._canceled) > len(self._queue) // 2:
+            with self._queue_lock:
+                self._queue[:] = [x for x in self._queue if x.task_id not in self._canceled]
+                heapq.heapify(self._queue)
+                self._canceled.clear()
+        if self._exited:
+            self._reap()
+        # Idle or at capacity: no session and no snapshot
+        if not self._queue or self._running_count >= self.cfg.scheduler.max_parallel:
+            return
+        # One session for all starts this tick; every decision sees the same snapshot
         with session_scope() as s:
-            for tid, handle in list(self._handles.items()):
-                rc = handle.popen.poll()
-                if rc is not None:
-                    # finished
-                    t = s.get(Task, tid)
-                    if t:
-                        t.state = "done" if rc == 0 else "failed"
-                        t.return_code = rc
-                        t.ended_at = utcnow()
-                        s.add(ScheduleEvent(kind="finished" if rc == 0 else "failed", task_id=tid, note=f"rc={rc}"))
-                    to_remove.append(tid)
-        for tid in to_remove:
+            snap = self.metrics.snapshot(include_processes=False)
+            while self._running_count < self.cfg.scheduler.max_parallel and self._queue:
+                t = await self._maybe_start_next(s, snap)
+                if not t:
+                    break
+
+    def _reap(self):
+        # Only children the exit callbacks reported; running ones aren't touched
+        finished = [(tid, self._handles[tid].proc.returncode) for tid in self._exited if tid in self._handles]
+        if finished:
+            # Own transaction: a failure while starting tasks later in the tick can't roll this back
+            with session_scope() as s:
+                # Canceled while running: keeps "canceled" and its cancel event, but still gets rc/ended_at
+                canceled = set(s.scalars(select(Task.id).where(Task.id.in_([tid for tid, _ in finished]),
+                                                               Task.state == "canceled")))
+                # One executemany UPDATE/INSERT for everything that exited since the last tick
+                now = utcnow()
+                s.execute(_REAP_STMT, [
+                    {"b_id": tid, "b_state": "done" if rc == 0 else "failed", "b_rc": rc, "b_ended": now}
+                    for tid, rc in finished
+                ])
+                events = [
+                    {"kind": "finished" if rc == 0 else "failed", "task_id": tid, "note": f"rc={rc}"}
+                    for tid, rc in finished if tid not in canceled
+                ]
+                if events:
+                    s.execute(insert(ScheduleEvent), events)
+        # Forget exits only once committed; if the commit raised they are retried next tick
+        for tid, _ in finished:
             self._handles.pop(tid, None)
-
-    async def _maybe_start_next(self) -> Optional[Task]:
-        if not self._queue:
+        self._exited.clear()
+
+    async def _maybe_start_next(self, s: Session, snap: Dict[str, Any]) -> Optional[Task]:
+        # Pop under the lock before any DB work: enqueue() may push from another thread meanwhile
+        with self._queue_lock:
+            item = None
+            while self._queue:
+                item = heapq.heappop(self._queue)
+                if item.task_id not in self._canceled:
+                    break
+                # Tombstoned by cancel(): drop without a DB lookup
+                self._canceled.discard(item.task_id)
+                item = None
+        if item is None:
             return None
-        item = heapq.heappop(self._queue)
-        with session_scope() as s:
-            t = s.get(Task, item.task_id)
-            if not t or t.state != "queued":
-                return None
-            snap = self.metrics.snapshot(include_processes=False)
-            rules = self._active_rules()
-            can, reasons = evaluate(snap, _task_as_dict(t), rules)
-            if not can:
-                # Push back with slight priority penalty to avoid starvation
-                t.priority += 1
-                self._push_queue(t)
-                s.add(ScheduleEvent(kind="deferred", task_id=t.id, note="; ".join(reasons)))
+        t = s.get(Task, item.task_id)
+        if not t or t.state != "queued":
+            return None
+        rules = self._active_compiled_rules()
+        can, reasons = evaluate_compiled(snap, t, rules)
+        if not can:
+            # Push back with slight priority penalty to avoid starvation
+            t.priority += 1
+            with self._queue_lock:
+                heapq.heappush(self._queue, QueueItem(item.priority + 1, item.ts, item.task_id))
+            s.add(ScheduleEvent(kind="deferred", task_id=t.id, note="; ".join(reasons)))
+            return None
+
+        # Claim the row in its own short transaction; a cancel() that got in first wins
+        with session_scope() as claim:
+            if not _set_state(claim, t.id, "queued", "running"):
                 return None
 
-            # Start
-            log_dir = get_config().storage.log_path
-            handle = start_subprocess(t.id, t.command, log_dir)
-            self._handles[t.id] = handle
-            t.state = "running"
-            t.started_at = utcnow()
-            t.pid = handle.popen.pid
-            t.log_path = str(handle.log_path)
-            s.add(ScheduleEvent(kind="started", task_id=t.id, note=t.command))
-            return t
+        # Start
+        log_dir = get_config().storage.log_path
+        try:
+            handle = await start_subprocess(t.id, t.command, log_dir)
+        except OSError as e:
+            # Log file or executable unusable: fail this task instead of dropping it with the tick
+            _set_state(s, t.id, "running", "failed", ended_at=utcnow())
+            s.add(ScheduleEvent(kind="failed", task_id=t.id, note=f"Start failed: {e}"))
+            return None
+        self._handles[t.id] = handle
+        self._running_count += 1
+        handle.wait_task = asyncio.create_task(handle.proc.wait())
+        handle.wait_task.add_done_callback(functools.partial(self._on_child_exit, t.id))
+        # Canceled during the spawn, before the handle was visible to cancel()
+        if s.scalar(select(Task.state).where(Task.id == t.id)) == "canceled":
+            terminate(handle)
+        # state is already "running" in the DB; only the spawn details are written here
+        t.started_at = utcnow()
+        t.pid = handle.proc.pid
+        t.log_path = str(handle.log_path)
+        s.add(ScheduleEvent(kind="started", task_id=t.id, note=t.command))
+        return t
+
+    def _on_child_exit(self, task_id: str, _fut: asyncio.Future):
+        # Runs on the loop thread as soon as the child exits; _tick does the DB work
+        self._running_count -= 1
+        self._exited.add(task_id)
+        if self._wake is not None:
+            self._wake.set()
 
     def _active_rules(self) -> Dict:
+        if self._rules_cache is not None and time.monotonic() - self._rules_loaded_at < _RULES_TTL_SEC:
+            return self._rules_cache
         with session_scope() as s:
-            p = s.query(Policy).filter(Policy.active == True).one_or_none()
+            p = s.scalar(select(Policy).where(Policy.active.is_(True)))
             if p:
-                return json.loads(p.json_rules)
+                rules = json.loads(p.json_rules)
+                if rules != self._rules_cache:
+                    self._cache_rules(rules)
+                else:
+                    self._rules_loaded_at = time.monotonic()
+                return self._rules_cache
         # seed default preset if nothing
         rules = PRESETS[self.cfg.scheduler.default_policy].rules
         self.policy_set(self.cfg.scheduler.default_policy, rules)
         return rules
 
+    def _active_compiled_rules(self) -> CompiledRules:
+        # _active_rules() refreshes the cache (and the compiled copy) when due
+        self._active_rules()
+        return self._compiled_rules
+
 
 # Singleton
 _scheduler: Optional[Scheduler] = None
@@ -239,11 +412,32 @@ def get_scheduler() -> Scheduler:
     return _scheduler
 
 
-def _task_as_dict(t: Task) -> Dict[str, any]:
-    return {
-        "requires_gpu": t.requires_gpu,
-        "min_vram_mb": t.min_vram_mb,
-        "max_cpu_pct": t.max_cpu_pct,
-        "max_mem_mb": t.max_mem_mb,
-        "priority": t.priority,
-    }
+# Reaping by primary key; done/failed only replaces "running" so a concurrent cancel() keeps "canceled"
+_REAP_STMT = (
+    update(Task.__table__)
+    .where(Task.__table__.c.id == bindparam("b_id"))
+    .values(state=case((Task.__table__.c.state == "running", bindparam("b_state")), else_=Task.__table__.c.state),
+            return_code=bindparam("b_rc"), ended_at=bindparam("b_ended"))
+)
+
+
+def _set_state(s: Session, task_id: str, from_state: str, to_state: str, **values: Any) -> bool:
+    """UPDATE one task's state (and any extra columns) if it's currently from_state; True if a row changed."""
+    stmt = (update(Task).where(Task.id == task_id, Task.state == from_state).values(state=to_state, **values)
+            .execution_options(synchronize_session=False))
+    return bool(s.execute(stmt).rowcount)
+
+
+def _new_task(payload: Dict[str, Any]) -> Task:
+    return Task(
+        name=payload.get("name", "task"),
+        command=payload["command"],
+        est_runtime_sec=payload.get("est_runtime_sec"),
+        requires_gpu=bool(payload.get("requires_gpu", False)),
+        min_vram_mb=int(payload.get("min_vram_mb", 0) or 0),
+        max_cpu_pct=int(payload.get("max_cpu_pct", 100) or 100),
+        max_mem_mb=int(payload.get("max_mem_mb", 0) or 0),
+        priority=int(payload.get("priority", 5) or 5),
+        deadline_ts=payload.get("deadline_ts"),
+        state="queued",
+    )
@@ -1,9 +1,10 @@
 # edgepilot/scheduler/policies.py
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass, field
 from datetime import datetime, time
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, NamedTuple, Optional
 import psutil
 
 
@@ -32,66 +33,126 @@ PRESETS: Dict[str, Policy] = {
 }
 
 
+@functools.lru_cache(maxsize=1)
+def _mem_total() -> int:
+    # Physical memory doesn't change while we run
+    return psutil.virtual_memory().total
+
+
+@functools.lru_cache(maxsize=64)
 def parse_time(s: str) -> time:
+    # Only a handful of distinct "HH:MM" strings exist across presets; parse each once
     hh, mm = [int(x) for x in s.split(":")]
     return time(hour=hh, minute=mm)
 
 
+@functools.lru_cache(maxsize=64)
+def _quiet_window(start_s: str, end_s: str) -> Tuple[int, int]:
+    """(start minute-of-day, window length in minutes); a window past midnight just wraps mod 1440."""
+    start = parse_time(start_s)
+    end = parse_time(end_s)
+    start_min = start.hour * 60 + start.minute
+    return start_min, (end.hour * 60 + end.minute - start_min) % 1440
+
+
 def in_quiet_hours(quiet: Dict[str, Any]) -> bool:
     if not quiet:
         return False
-    now = datetime.now().time()
-    start = parse_time(quiet.get("start", "22:00"))
-    end = parse_time(quiet.get("end", "07:00"))
-    if start < end:
-        return start <= now < end
-    # Over midnight
-    return (now >= start) or (now < end)
+    return _in_window(*_quiet_window(quiet.get("start", "22:00"), quiet.get("end", "07:00")))
+
+
+def _in_window(start_min: int, span_min: int) -> bool:
+    now = datetime.now()
+    return (now.hour * 60 + now.minute - start_min) % 1440 < span_min
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledRules:
+    """Policy rules with defaults applied and quiet hours parsed, built once per policy change."""
+    cpu_max: float
+    mem_reserve_mb: int
+    battery_min: int
+    gpu_max_util: float
+    quiet_start_min: Optional[int]
+    quiet_span_min: int
+    quiet_allow_plugged: bool
+
+
+class TaskLimits(NamedTuple):
+    """The task fields evaluate_compiled() reads; a Task row has the same attributes."""
+    requires_gpu: bool = False
+    min_vram_mb: int = 0
+    max_cpu_pct: int = 100
+    max_mem_mb: int = 0
+
+
+def compile_rules(rules: Dict[str, Any]) -> CompiledRules:
+    quiet = rules.get("quiet_hours")
+    if quiet:
+        start_min, span_min = _quiet_window(quiet.get("start", "22:00"), quiet.get("end", "07:00"))
+    else:
+        start_min, span_min = None, 0
+    return CompiledRules(
+        cpu_max=rules.get("cpu_max_pct", 100),
+        mem_reserve_mb=rules.get("mem_reserve_mb", 0),
+        battery_min=int(rules.get("battery_min_pct", 0)),
+        gpu_max_util=float(rules.get("gpu_max_util_pct", 90)),
+        quiet_start_min=start_min,
+        quiet_span_min=span_min,
+        quiet_allow_plugged=bool(quiet.get("allow_if_plugged", True)) if quiet else True,
+    )
 
 
 def evaluate(snapshot: Dict[str, Any], task: Dict[str, Any], rules: Dict[str, Any]) -> Tuple[bool, List[str]]:
     """Return (can_start, reasons[]) based on snapshot/process conditions and policy rules."""
+    limits = TaskLimits(**{k: task[k] for k in TaskLimits._fields if k in task})
+    return evaluate_compiled(snapshot, limits, compile_rules(rules))
+
+
+def evaluate_compiled(snapshot: Dict[str, Any], task: Any, rules: CompiledRules) -> Tuple[bool, List[str]]:
+    """evaluate() against precompiled rules; task is a Task row or TaskLimits (attribute access only)."""
     reasons: List[str] = []
 
     cpu = float(snapshot.get("cpu_total_pct", 0.0))
     mem_used = int(snapshot.get("mem_used_bytes", 0))
-    total = psutil.virtual_memory().total
+    total = snapshot.get("mem_total_bytes") or _mem_total()
     mem_free_mb = int((total - mem_used) / (1024 * 1024))
     gpu = snapshot.get("gpu", {})
     power = snapshot.get("power", {})
 
     # Policy checks
-    cpu_max = int(min(rules.get("cpu_max_pct", 100), task.get("max_cpu_pct", 100)))
+    cpu_max = int(min(rules.cpu_max, task.max_cpu_pct))
     if cpu > cpu_max:
         reasons.append(f"CPU {cpu:.0f}% exceeds limit {cpu_max}%")
 
-    mem_reserve = int(max(rules.get("mem_reserve_mb", 0), task.get("max_mem_mb", 0)))
+    mem_reserve = int(max(rules.mem_reserve_mb, task.max_mem_mb))
     if mem_free_mb < mem_reserve:
         reasons.append(f"Free memory {mem_free_mb}MB below reserve {mem_reserve}MB")
 
     # Battery / plugged
-    battery_min = int(rules.get("battery_min_pct", 0))
+    battery_min = rules.battery_min
     plugged = bool(power.get("plugged", False))
     batt_pct = float(power.get("battery_pct") or 0)
     if battery_min and not plugged and batt_pct and batt_pct < battery_min:
         reasons.append(f"Battery {batt_pct:.0f}% below minimum {battery_min}%")
 
     # Quiet hours
-    quiet = rules.get("quiet_hours")
-    if quiet and in_quiet_hours(quiet) and not (plugged and quiet.get("allow_if_plugged", True)):
+    if (rules.quiet_start_min is not None
+            and _in_window(rules.quiet_start_min, rules.quiet_span_min)
+            and not (plugged and rules.quiet_allow_plugged)):
         reasons.append("Quiet hours in effect")
 
     # GPU
-    if task.get("requires_gpu"):
+    if task.requires_gpu:
         if not gpu.get("available"):
             reasons.append("GPU required but not detected")
         else:
             gpu_util = float(gpu.get("util_pct", 0))
-            gpu_limit = float(rules.get("gpu_max_util_pct", 90))
+            gpu_limit = rules.gpu_max_util
             if gpu_util > gpu_limit:
                 reasons.append(f"GPU util {gpu_util:.0f}% exceeds limit {gpu_limit:.0f}%")
 
-            min_vram = int(task.get("min_vram_mb", 0))
+            min_vram = int(task.min_vram_mb)
             total_bytes = int(gpu.get("mem_total_bytes") or 0)
             used_bytes = int(gpu.get("mem_used_bytes") or 0)
             free_mb = int((total_bytes - used_bytes) / (1024 * 1024)) if total_bytes else 0
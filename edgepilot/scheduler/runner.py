@@ -1,34 +1,61 @@
 # edgepilot/scheduler/runner.py
 from __future__ import annotations
 
+import asyncio
 import os
+import re
 import shlex
+import signal
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from ..config import get_config
+
+# Pipes, redirects, chaining, substitution, globs: only bash can run these
+_NEEDS_SHELL = re.compile(r"[|&;<>`$()*?~\n]")
+
 
 @dataclass
 class TaskHandle:
     task_id: str
-    popen: subprocess.Popen
+    proc: asyncio.subprocess.Process
     log_path: Path
+    # proc.wait() running on the loop; done once the child has exited
+    wait_task: Optional[asyncio.Task] = None
 
 
-def start_subprocess(task_id: str, command: str, log_dir: Path) -> TaskHandle:
+async def start_subprocess(task_id: str, command: str, log_dir: Path) -> TaskHandle:
     log_dir.mkdir(parents=True, exist_ok=True)
     log_file = log_dir / f"{task_id}.log"
-    # Rotate a small log if exists
-    if log_file.exists() and log_file.stat().st_size > 10 * 1024 * 1024:
-        log_file.rename(log_dir / f"{task_id}.1.log")
+    # Rotate a small log if exists: one stat, then an atomic replace over any older .1.log
+    try:
+        size = os.stat(log_file).st_size
+    except FileNotFoundError:
+        size = 0
+    if size > get_config().scheduler.task_log_size_mb * 1024 * 1024:
+        os.replace(log_file, log_dir / f"{task_id}.1.log")
 
     with open(log_file, "ab") as f:
-        try:
-            # Prefer list args for safety; fall back to shell if user relies on shell features
-            args = shlex.split(command)
-            pop = subprocess.Popen(args, stdout=f, stderr=subprocess.STDOUT)
-        except Exception:
-            # shell=True fallback can help in constrained environments
-            pop = subprocess.Popen(command, stdout=f, stderr=subprocess.STDOUT, shell=True, executable="/bin/bash")
-    return TaskHandle(task_id=task_id, popen=pop, log_path=log_file)
+        # Own session/process group so cancel can signal the whole tree
+        kw = dict(stdout=f, stderr=subprocess.STDOUT, start_new_session=True)
+        proc = None
+        if not _NEEDS_SHELL.search(command):
+            try:
+                # Prefer list args for safety
+                proc = await asyncio.create_subprocess_exec(*shlex.split(command), **kw)
+            except (ValueError, OSError):
+                # Unbalanced quotes, builtins, VAR=x prefixes: let bash sort it out
+                pass
+        if proc is None:
+            proc = await asyncio.create_subprocess_shell(command, executable="/bin/bash", **kw)
+    return TaskHandle(task_id=task_id, proc=proc, log_path=log_file)
+
+
+def terminate(handle: TaskHandle) -> None:
+    """SIGTERM the task's process group, reaching children the shell or command spawned."""
+    try:
+        os.killpg(handle.proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
@@ -1,5 +1,11 @@
 # tests/test_metrics.py
+import asyncio
+import time
+
+import pytest
+
 from edgepilot.metrics import get_metrics_service
+from edgepilot.metrics.collector import MetricsService, _STREAM_QUEUE_MAX
 
 def test_snapshot_has_core_fields():
     svc = get_metrics_service()
@@ -9,3 +15,127 @@ def test_snapshot_has_core_fields():
     assert "net" in snap and "rx_bytes" in snap["net"]
     assert "disk" in snap and "read_bytes" in snap["disk"]
     assert isinstance(snap.get("processes", []), list)
+
+def test_proc_linux_read_stat_comm_with_spaces_and_parens(monkeypatch):
+    from edgepilot.metrics import proc_linux
+    # state ppid pgrp session tty tpgid flags minflt cminflt majflt cmajflt utime stime
+    # cutime cstime priority nice num_threads itrealvalue starttime vsize rss ...
+    stat = b"4242 (my ) (odd) name) S 1 4242 4242 0 -1 4194304 100 0 0 0 150 50 0 0 20 0 7 0 12345 1000000 300 18446744073709551615\n"
+    monkeypatch.setattr(proc_linux, "_read", lambda path, size=4096: stat)
+    name, ticks, threads, rss = proc_linux.read_stat(4242)
+    assert name == "my ) (odd) name"
+    assert ticks == 200
+    assert threads == 7
+    assert rss == 300 * proc_linux._PAGE_SIZE
+
+def test_proc_linux_read_io(monkeypatch):
+    from edgepilot.metrics import proc_linux
+    io = (b"rchar: 999\nwchar: 888\nsyscr: 1\nsyscw: 2\n"
+          b"read_bytes: 4096\nwrite_bytes: 8192\ncancelled_write_bytes: 0\n")
+    monkeypatch.setattr(proc_linux, "_read", lambda path, size=4096: io)
+    assert proc_linux.read_io(1) == (4096, 8192)
+
+    def denied(path, size=4096):
+        raise PermissionError(path)
+    monkeypatch.setattr(proc_linux, "_read", denied)
+    assert proc_linux.read_io(1) == (0, 0)
+
+
+# ---------- Streams (fake sampler: ts counts collections) ----------
+
+@pytest.fixture
+def streaming(monkeypatch):
+    svc = MetricsService()
+    calls = []
+
+    def sample(include_processes, top_n):
+        calls.append(include_processes)
+        flat = {"ts": len(calls), "cpu_total_pct": 0.0, "mem_used_bytes": 0, "mem_total_bytes": 1,
+                "swap_used_bytes": 0, "net_rx_bytes": 0, "net_tx_bytes": 0,
+                "disk_read_bytes": 0, "disk_write_bytes": 0, "gpu": {}, "power": {}}
+        if include_processes:
+            flat["processes"] = []
+        return flat
+    monkeypatch.setattr(svc, "_sample", sample)
+    yield svc, calls
+    for sid in list(svc._streams):
+        svc.stop_stream(sid)
+    svc._executor.shutdown(wait=False)
+
+@pytest.mark.asyncio
+async def test_streams_with_different_intervals_share_ticks(streaming):
+    svc, calls = streaming
+    fast = svc.start_stream(interval=0.1)
+    slow = svc.start_stream(interval=0.2)
+    fast_ts = [(await svc.stream_next(fast))["ts"] for _ in range(4)]
+    slow_ts = [(await svc.stream_next(slow))["ts"] for _ in range(2)]
+    # Every tick feeds the fast stream; the slow one only ever gets samples from those same ticks
+    assert fast_ts == [1, 2, 3, 4]
+    assert set(slow_ts) <= set(fast_ts)
+    assert len(slow_ts) == len(set(slow_ts))
+
+@pytest.mark.asyncio
+async def test_stream_include_processes_fan_out(streaming):
+    svc, calls = streaming
+    full = svc.start_stream(interval=0.1, include_processes=True)
+    lean = svc.start_stream(interval=0.1)
+    a = await svc.stream_next(full)
+    b = await svc.stream_next(lean)
+    # One collection with processes; the process-free stream gets a copy without them
+    assert calls == [True]
+    assert a["ts"] == b["ts"]
+    assert "processes" in a and "processes" not in b
+
+@pytest.mark.asyncio
+async def test_stream_drops_oldest_when_full(streaming):
+    svc, calls = streaming
+    sid = svc.start_stream(interval=0.01)
+    while len(calls) < _STREAM_QUEUE_MAX + 3:
+        await asyncio.sleep(0.01)
+    assert svc._streams[sid].queue.qsize() == _STREAM_QUEUE_MAX
+    assert (await svc.stream_next(sid))["ts"] > 1
+
+@pytest.mark.asyncio
+async def test_producer_stops_with_last_stream(streaming):
+    svc, calls = streaming
+    a = svc.start_stream(interval=0.1)
+    b = svc.start_stream(interval=0.1)
+    producer = svc._producer
+    assert svc.stop_stream(a)
+    assert svc._producer is producer and not producer.done()
+    assert svc.stop_stream(b)
+    assert svc._producer is None
+    await asyncio.sleep(0)
+    assert producer.cancelled()
+    assert not svc.stop_stream(b)
+    assert await svc.stream_next(b) is None
+
+
+# ---------- Runs ----------
+
+@pytest.fixture
+def isolated_db(tmp_path, monkeypatch):
+    from edgepilot import config, db
+    cfg = config.Config()
+    cfg.storage.base_dir = tmp_path
+    monkeypatch.setattr(config, "_config", cfg)
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_SessionLocal", None)
+    monkeypatch.setattr(db, "_initialized", False)
+
+@pytest.mark.asyncio
+async def test_end_run_keeps_in_flight_sample(isolated_db, monkeypatch):
+    svc = MetricsService()
+
+    def slow_collect(include_processes, top_n, now):
+        time.sleep(0.3)
+        return {"ts": now.isoformat(), "cpu_total_pct": 50.0, "mem_used_bytes": 1 << 30, "mem_total_bytes": 1 << 32,
+                "swap_used_bytes": 0, "net_rx_bytes": 0, "net_tx_bytes": 0,
+                "disk_read_bytes": 0, "disk_write_bytes": 0, "gpu": {}, "power": {}}
+    monkeypatch.setattr(svc, "_collect_snapshot", slow_collect)
+    run_id = svc.start_run(sampling_sec=60)["run_id"]
+    await asyncio.sleep(0.05)  # first sample is now collecting on the executor
+    res = await svc.end_run(run_id)
+    assert res["summary"]["samples"] == 1
+    assert not svc._pending
+    svc._executor.shutdown(wait=False)
@@ -1,4 +1,11 @@
 # tests/test_scheduler.py
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from edgepilot.scheduler import policies
 from edgepilot.scheduler.policies import evaluate, PRESETS
 
 def test_policy_evaluate_allows_when_idle():
@@ -20,3 +27,170 @@ def test_policy_blocks_on_high_cpu():
     rules = PRESETS["balanced_defaults"].rules
     ok, reasons = evaluate(snap, task, rules)
     assert not ok and any("CPU" in r for r in reasons)
+
+
+# ---------- Scheduler execution (temp DB, real subprocesses) ----------
+
+@pytest.fixture
+def sched(tmp_path, monkeypatch):
+    from edgepilot import config, db
+    from edgepilot.scheduler.core import Scheduler
+    cfg = config.Config()
+    cfg.storage.base_dir = tmp_path
+    cfg.scheduler.max_parallel = 1
+    monkeypatch.setattr(config, "_config", cfg)
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_SessionLocal", None)
+    monkeypatch.setattr(db, "_initialized", False)
+    s = Scheduler()
+    s.policy_set("test", {})  # no limits
+    return s
+
+
+async def _settle(s):
+    # Wait for every started child, let the exit callbacks run, then reap
+    for handle in list(s._handles.values()):
+        await handle.wait_task
+    await asyncio.sleep(0)
+    await s._tick()
+
+
+def _states(s):
+    return {t.name: (t.state, t.return_code) for t in s.list()}
+
+
+@pytest.mark.asyncio
+async def test_start_exit_and_reap(sched):
+    sched.cfg.scheduler.max_parallel = 2
+    sched.enqueue(name="ok", command="true")
+    sched.enqueue(name="bad", command="sh -c 'exit 3'")
+    await sched._tick()
+    assert sched._running_count == 2
+    await _settle(sched)
+    assert _states(sched) == {"ok": ("done", 0), "bad": ("failed", 3)}
+    assert sched._running_count == 0 and not sched._handles and not sched._exited
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_is_tombstoned_and_skipped(sched):
+    a = sched.enqueue(name="a", command="true", priority=1)
+    sched.enqueue(name="b", command="true", priority=2)
+    assert sched.cancel(a.id)
+    assert a.id in sched._canceled
+    await sched._tick()
+    await _settle(sched)
+    assert _states(sched) == {"a": ("canceled", None), "b": ("done", 0)}
+    assert not sched._queue and not sched._canceled
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_keeps_canceled(sched):
+    t = sched.enqueue(name="long", command="sleep 30")
+    await sched._tick()
+    assert sched._running_count == 1
+    assert sched.cancel(t.id)
+    await _settle(sched)
+    row = sched.list()[0]
+    assert (row.state, row.return_code) == ("canceled", -15)
+    assert row.ended_at is not None
+    assert sched._running_count == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_during_start_is_not_lost(sched, monkeypatch):
+    from edgepilot.scheduler import core
+    t = sched.enqueue(name="racy", command="sleep 30")
+    spawn = core.start_subprocess
+    canceled = []
+
+    async def cancel_then_spawn(*args, **kwargs):
+        # cancel() from an API thread lands while the tick awaits the spawn
+        canceled.append(await asyncio.to_thread(sched.cancel, t.id))
+        return await spawn(*args, **kwargs)
+    monkeypatch.setattr(core, "start_subprocess", cancel_then_spawn)
+    await sched._tick()
+    assert canceled == [True]
+    await _settle(sched)
+    row = sched.list()[0]
+    assert (row.state, row.return_code) == ("canceled", -15)
+    assert sched._running_count == 0
+
+
+@pytest.mark.asyncio
+async def test_running_count_respects_max_parallel(sched):
+    sched.cfg.scheduler.max_parallel = 2
+    for i in range(5):
+        sched.enqueue(name=f"t{i}", command="true")
+    while sched._queue or sched._handles:
+        await sched._tick()
+        assert sched._running_count <= 2
+        await _settle(sched)
+    assert sched._running_count == 0
+    assert {state for state, _ in _states(sched).values()} == {"done"}
+
+
+@pytest.mark.asyncio
+async def test_reap_survives_start_failure(sched, monkeypatch):
+    from edgepilot.scheduler import core
+    sched.enqueue(name="x", command="sleep 0.1")
+    await sched._tick()
+    sched.enqueue(name="y", command="true")
+    await sched._handles[next(iter(sched._handles))].wait_task
+    await asyncio.sleep(0)
+
+    async def broken(*args, **kwargs):
+        raise OSError("log dir unwritable")
+    monkeypatch.setattr(core, "start_subprocess", broken)
+    await sched._tick()
+    assert _states(sched) == {"x": ("done", 0), "y": ("failed", None)}
+    assert sched._running_count == 0 and not sched._handles
+
+
+@pytest.mark.asyncio
+async def test_enqueue_during_start_is_not_lost(sched, monkeypatch):
+    sched.enqueue(name="a", command="true", priority=5)
+    get = Session.get
+    pushed = []
+
+    def get_and_enqueue(self, *args, **kwargs):
+        # A higher-priority enqueue (API thread) lands while the tick is in the DB
+        if not pushed:
+            pushed.append(sched.enqueue(name="b", command="true", priority=1))
+        return get(self, *args, **kwargs)
+    monkeypatch.setattr(Session, "get", get_and_enqueue)
+    await sched._tick()
+    assert [item.task_id for item in sched._queue] == [pushed[0].id]
+    assert _states(sched)["a"][0] == "running"
+
+
+# ---------- Quiet hours ----------
+
+def _at(monkeypatch, hh, mm):
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 1, 1, hh, mm)
+    monkeypatch.setattr(policies, "datetime", _Clock)
+
+
+@pytest.mark.parametrize("hh,mm,quiet", [(8, 59, False), (9, 0, True), (16, 59, True), (17, 0, False)])
+def test_quiet_hours_same_day(monkeypatch, hh, mm, quiet):
+    _at(monkeypatch, hh, mm)
+    assert policies.in_quiet_hours({"start": "09:00", "end": "17:00"}) is quiet
+
+
+@pytest.mark.parametrize("hh,mm,quiet", [(21, 59, False), (22, 0, True), (0, 0, True), (6, 59, True), (7, 0, False)])
+def test_quiet_hours_over_midnight(monkeypatch, hh, mm, quiet):
+    _at(monkeypatch, hh, mm)
+    assert policies.in_quiet_hours({"start": "22:00", "end": "07:00"}) is quiet
+
+
+@pytest.mark.parametrize("hh,mm", [(0, 0), (12, 0), (23, 59)])
+def test_quiet_hours_empty_when_start_equals_end(monkeypatch, hh, mm):
+    _at(monkeypatch, hh, mm)
+    assert not policies.in_quiet_hours({"start": "00:00", "end": "00:00"})
+    snap = {"cpu_total_pct": 10.0, "mem_used_bytes": 0, "mem_total_bytes": 1 << 40,
+            "gpu": {"available": False}, "power": {"available": True, "plugged": False}}
+    task = {"requires_gpu": False, "min_vram_mb": 0, "max_cpu_pct": 100, "max_mem_mb": 0}
+    ok, reasons = evaluate(snap, task, PRESETS["performance"].rules)
+    assert ok, reasons
@@ -1,32 +1,42 @@
 # edgepilot/ui/app.py
 
-import json
 from pathlib import Path
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from importlib.resources import files  # add this
 
 # CHANGE THESE THREE LINES ↓↓↓
 from edgepilot.config import get_config
-from edgepilot.llm.ollama import OllamaProvider
+from edgepilot.llm.ollama import OllamaProvider, complete_once
+from edgepilot.metrics import llm_view
 from edgepilot.usage import record_usage
 
 cfg = get_config()
 API = f"http://{cfg.host}:{cfg.api_port}"
 
 
+@st.cache_resource
+def _http_session() -> requests.Session:
+    # Streamlit re-executes this script on every rerun; cache_resource keeps one pooled session alive
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+
 st.set_page_config(page_title="EdgePilot", layout="wide")
 st.title("EdgePilot — System Health, Scheduling, and Optimization")
 
 
 def api_get(path: str, **params):
-    r = requests.get(f"{API}{path}", params=params, timeout=30)
+    r = _http_session().get(f"{API}{path}", params=params, timeout=30)
     r.raise_for_status()
     return r.json()
 
 
 def api_post(path: str, json_body: dict):
-    r = requests.post(f"{API}{path}", json=json_body, timeout=30)
+    r = _http_session().post(f"{API}{path}", json=json_body, timeout=30)
     r.raise_for_status()
     return r.json()
 
@@ -115,9 +125,10 @@ with st.form("qa"):
         provider = OllamaProvider()
         prompt = files("edgepilot.llm.prompts").joinpath("bottleneck.md").read_text(encoding="utf-8")
         prompt = prompt.replace("{{ question }}", q or "What should I do now?")
-        prompt = prompt.replace("{{ snapshot_json }}", json.dumps(snap)[:8000])
+        # Only what the advisor needs (no cmdlines/io); orjson for the encode
+        prompt = prompt.replace("{{ snapshot_json }}", orjson.dumps(llm_view(snap)).decode()[:8000])
         import asyncio
-        res = asyncio.run(provider.complete(prompt))
+        res = asyncio.run(complete_once(provider, prompt))
         st.write(res.text)
 
 # --- Usage ---
@@ -1,46 +1,71 @@
 # edgepilot/usage.py
 from __future__ import annotations
 
+import threading
+import time
+from collections import Counter
 from typing import Optional, Dict, Any
 from sqlalchemy import select, func
 from .db import session_scope, init_db
 from .models import Usage
 from .config import get_config
 
+# DB aggregate as of the last refresh, plus what this process recorded since then;
+# /usage/stats and `edgepilot advise` read from here instead of scanning the table each call.
+_USAGE_TTL_SEC = 2.0
+_USAGE_CACHE: Dict[str, Any] = {"data": None, "ts": 0.0}
+_pending: Counter = Counter()
+_usage_lock = threading.Lock()
+
 
 def record_usage(provider: str, model: str, prompt_len: int, response_len: int,
                  tool_calls: int = 0, tokens_in: Optional[int] = None,
                  tokens_out: Optional[int] = None, latency_ms: Optional[int] = None,
                  ok: bool = True) -> None:
     init_db()
-    with session_scope() as s:
-        s.add(Usage(
-            provider=provider,
-            model=model,
-            prompt_len=prompt_len,
-            response_len=response_len,
-            tool_calls=tool_calls,
-            tokens_in=tokens_in,
-            tokens_out=tokens_out,
-            latency_ms=latency_ms,
-            ok=ok,
-        ))
+    # Insert and count under one lock so a concurrent refresh can't count the row twice
+    with _usage_lock:
+        with session_scope() as s:
+            s.add(Usage(
+                provider=provider,
+                model=model,
+                prompt_len=prompt_len,
+                response_len=response_len,
+                tool_calls=tool_calls,
+                tokens_in=tokens_in,
+                tokens_out=tokens_out,
+                latency_ms=latency_ms,
+                ok=ok,
+            ))
+        _pending.update(calls=1, prompt_len=prompt_len, tool_calls=tool_calls)
 
 
-def usage_stats() -> Dict[str, Any]:
-    init_db()
-    cfg = get_config()
+def _refresh_aggregate() -> None:
     with session_scope() as s:
+        # NULL sums (empty table) become 0 in SQL
         q = select(
             func.count(Usage.id),
-            func.avg(Usage.prompt_len),
-            func.sum(Usage.tool_calls),
+            func.coalesce(func.sum(Usage.prompt_len), 0),
+            func.coalesce(func.sum(Usage.tool_calls), 0),
         )
-        count, avg_prompt, tool_calls = s.execute(q).one()
-        return {
-            "provider": cfg.llm.provider,
-            "model": cfg.llm.model,
-            "calls": int(count or 0),
-            "avg_context_chars": int(avg_prompt or 0),
-            "tool_calls": int(tool_calls or 0),
-        }
+        count, prompt_total, tool_calls = s.execute(q).one()
+    _USAGE_CACHE["data"] = Counter(calls=count, prompt_len=prompt_total, tool_calls=tool_calls)
+    _USAGE_CACHE["ts"] = time.monotonic()
+    _pending.clear()
+
+
+def usage_stats() -> Dict[str, Any]:
+    init_db()
+    cfg = get_config()
+    with _usage_lock:
+        if _USAGE_CACHE["data"] is None or time.monotonic() - _USAGE_CACHE["ts"] >= _USAGE_TTL_SEC:
+            _refresh_aggregate()
+        totals = _USAGE_CACHE["data"] + _pending
+    calls = totals["calls"]
+    return {
+        "provider": cfg.llm.provider,
+        "model": cfg.llm.model,
+        "calls": calls,
+        "avg_context_chars": int(totals["prompt_len"] / calls) if calls else 0,
+        "tool_calls": totals["tool_calls"],
+    }